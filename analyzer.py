@@ -5,18 +5,35 @@ Uses Strands Agents AI to analyze scraped content and generate timeline and summ
 With comprehensive retry logic for API calls
 """
 
-import json
+import asyncio
+import hashlib
 import os
+import random
 import re
 import time
 import logging
+import threading
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from datetime import datetime
-from collections import defaultdict
+from itertools import groupby, islice
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from strands import Agent
 from tqdm import tqdm
 
+import json_io
+
+try:
+    import ijson
+except ImportError:  # ijson is optional - without it timeline.json is loaded whole
+    ijson = None
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional - cache keys fall back to sha256
+    xxhash = None
+
 # Set up logging - only errors to stdout, everything to file
 file_handler = logging.FileHandler('analyzer.log')
 file_handler.setLevel(logging.INFO)
@@ -37,54 +54,254 @@ logging.getLogger('strands').setLevel(logging.ERROR)
 logging.getLogger('botocore').setLevel(logging.ERROR)
 logging.getLogger('boto3').setLevel(logging.ERROR)
 
+# Bump when prompts change so stale cached responses are not reused
+LLM_CACHE_VERSION = 2
+
+SEP = "=" * 80
+
+# Claude has a ~200K token window; reserve ~25K for the prompt template and response
+MAX_CONTENT_TOKENS = 175000
+# No offline Claude tokenizer, so estimate - English wiki prose averages ~4 chars/token
+CHARS_PER_TOKEN = 4
+
+# Compiled once - these run per batch and per event
+_JSON_BLOCK_RE = re.compile(r'```json\s*(\{.*?\})\s*```', re.DOTALL)
+_SAFE_FN_RE = re.compile(r'[^\w\s-]')  # Same sanitization the scraper uses for filenames
+
+# Shared by every event whose source page has no media - never mutated
+EMPTY_MEDIA = {'images': [], 'videos': []}
+
+
+def _content_hash(data: bytes) -> str:
+    """Fast fingerprint for content-addressed caching - not used for anything security-related"""
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def _chronological_key(event: Dict, _undated: Tuple[int, int, int] = (9999, 1, 1)) -> Tuple[int, int, int]:
+    """Sort key for YYYY, YYYY-MM and YYYY-MM-DD dates - anything else sorts last"""
+    parts = str(event.get('date') or '').split('-')
+    try:
+        return (int(parts[0]),
+                int(parts[1]) if len(parts) > 1 else 1,
+                int(parts[2]) if len(parts) > 2 else 1)
+    except ValueError:
+        return _undated
+
+
+def _year_key(event: Dict) -> str:
+    """Year heading an event is listed under in the markdown timeline"""
+    date = event.get('date')
+    return date[:4] if date else 'Unknown'
+
+
+def _decade_key(event: Dict) -> Optional[int]:
+    """Decade an event falls in, or None if its date has no leading year"""
+    year = event.get('date', '0000')[:4]
+    return (int(year) // 10) * 10 if year.isdigit() else None
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency control for AI calls, in the style of TCP congestion control:
+    add 0.5 slots after each clean batch, halve on throttling or when p95 latency
+    exceeds the target. Callers acquire a slot while in-flight < current limit."""
+    
+    def __init__(self, initial: int, maximum: int, latency_target: float):
+        self.concurrency = float(initial)
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.latencies = deque(maxlen=20)
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+    
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.concurrency))
+    
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+    
+    async def release(self):
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+    
+    async def record(self, started_at: float, latency: float, throttled: bool):
+        """Feed back one finished call and adjust the limit"""
+        self.latencies.append(latency)
+        ordered = sorted(self.latencies)
+        p95 = ordered[int(0.95 * (len(ordered) - 1))]
+        
+        if throttled or p95 > self.latency_target:
+            # Calls already in flight when we last backed off report the same congestion - count it once
+            if started_at > self._last_decrease:
+                self.concurrency = max(1.0, self.concurrency * 0.5)
+                self._last_decrease = time.monotonic()
+                self.latencies.clear()
+                logger.info(f"Throttling/latency detected, concurrency reduced to {self.limit}")
+        else:
+            self.concurrency = min(float(self.maximum), self.concurrency + 0.5)
+            # A higher limit may let waiting batches start
+            async with self._cond:
+                self._cond.notify_all()
+
+
 class CWCkiAnalyzer:
     def __init__(self, scraped_data_dir: str = "scraped_data"):
         self.data_dir = Path(scraped_data_dir)
         self.clean_text_dir = self.data_dir / "clean_text"
-        self.agent = Agent()
+        self.cache_dir = self.data_dir / ".llm_cache"
+        self._local = threading.local()
         self.max_retries = 5
         self.retry_delay = 3  # Initial retry delay in seconds
+        self.max_retry_delay = 60  # Backoff cap in seconds
+        self.call_timeout = 300  # Give up on a single AI call after 5 minutes
+        self.initial_concurrency = 4  # Batches in flight at once against Bedrock...
+        self.max_concurrency = 8  # ...adapting up to this many while calls stay fast
+        self.latency_target = 180  # Back off when p95 batch latency exceeds this (seconds)
+        self.throttle_events = 0  # ThrottlingExceptions seen, read by the concurrency limiter
+        self._stats_lock = threading.Lock()
+        # In-process LRU layer over the disk cache, by cache key - bounded, since every
+        # timeline batch response passes through it
+        self._memo: OrderedDict = OrderedDict()
+        self.memo_size = 128
+        self._memo_lock = threading.Lock()
+        # Identifies the model in cache keys so cached responses are not shared across
+        # models - resolved once, from the main thread's Agent
+        config = getattr(getattr(self._get_agent(), 'model', None), 'config', None) or {}
+        self.model_id = str(config.get('model_id', 'default'))
         
+    def _get_agent(self) -> Agent:
+        """Get this thread's Agent - Strands agents must not be shared between threads"""
+        agent = getattr(self._local, 'agent', None)
+        if agent is None:
+            agent = self._local.agent = Agent()
+        return agent
+    
+    def _cache_key(self, prompt: str) -> str:
+        """Content-addressed key for a prompt sent to a given model"""
+        key_source = f"v{LLM_CACHE_VERSION}|{self.model_id}|{prompt}"
+        return _content_hash(key_source.encode())
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Return a cached AI response, or None on a miss"""
+        with self._memo_lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        cache_path = self.cache_dir / f"{key}.json"
+        if not cache_path.exists():
+            return None
+        try:
+            response = json_io.load(cache_path)['response']
+            self._memo_put(key, response)
+            return response
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {cache_path.name}: {e}")
+            return None
+    
+    def _memo_put(self, key: str, response: str):
+        """Remember a response in memory, evicting the least recently used past memo_size"""
+        with self._memo_lock:
+            self._memo[key] = response
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+    
+    def _cache_put(self, key: str, response: str):
+        """Store an AI response - json_io writes atomically, so a crash never leaves a half-written entry"""
+        self._memo_put(key, response)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        json_io.dump({
+            'version': LLM_CACHE_VERSION,
+            'model': self.model_id,
+            'response': response,
+            'cached_at': datetime.now().isoformat()
+        }, self.cache_dir / f"{key}.json", indent=False)
+    
+    def invalidate_cached_batch(self, pages: List[Dict], purpose: str = "events"):
+        """Drop a cached response, e.g. one that turned out to be unparseable"""
+        key = self._cache_key(self._build_prompt(pages, purpose))
+        with self._memo_lock:
+            self._memo.pop(key, None)
+        (self.cache_dir / f"{key}.json").unlink(missing_ok=True)
+    
     def load_all_pages(self) -> List[Dict[str, str]]:
         """Load all scraped page content"""
         print("Loading scraped pages...")
-        pages = []
         
-        for text_file in self.clean_text_dir.glob("*.txt"):
-            with open(text_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                pages.append({
-                    'filename': text_file.stem,
-                    'content': content
-                })
+        def read_page(text_file: Path) -> Dict[str, str]:
+            return {
+                'filename': text_file.stem,
+                'content': text_file.read_text(encoding='utf-8')
+            }
+        
+        # Reads are I/O-bound, so threads overlap the open()/read() latency
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            pages = list(executor.map(read_page, self.clean_text_dir.glob("*.txt")))
         
         print(f"Loaded {len(pages)} pages")
         return pages
     
-    def analyze_page_batch(self, pages: List[Dict], purpose: str = "events", retry_count: int = 0) -> str:
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Approximate token count for budgeting prompt content"""
+        return -(-len(text) // CHARS_PER_TOKEN)
+    
+    def _allocate_page_budgets(self, pages: List[Dict]) -> List[int]:
+        """Water-fill MAX_CONTENT_TOKENS across pages: any page needing less than an
+        even share of what's left gets all it needs, the rest split the remainder"""
+        needs = [self._estimate_tokens(page['content']) for page in pages]
+        budgets = list(needs)
+        remaining = MAX_CONTENT_TOKENS
+        unfilled = sorted(range(len(pages)), key=needs.__getitem__)
+        
+        for n, idx in enumerate(unfilled):
+            share = remaining // (len(unfilled) - n)
+            if needs[idx] > share:
+                # Every page from here on is at least this long - cap them all
+                for capped in unfilled[n:]:
+                    budgets[capped] = share
+                break
+            remaining -= needs[idx]
+        
+        return budgets
+    
+    def analyze_page_batch(self, pages: List[Dict], purpose: str = "events") -> str:
         """Analyze a batch of pages with comprehensive retry logic"""
-        # Combine page content - intelligent content management for context window
-        # Claude Sonnet has ~200K token context, ~750K chars
-        # Reserve 50K for prompt/response, leaving ~700K for content
-        # With batch_size=20, that's ~35K chars per page - much more than before!
+        if not any(page.get('content', '').strip() for page in pages):
+            # Nothing to analyze (e.g. every page failed to scrape) - skip the AI round-trip
+            return '{"events": []}' if purpose == "events" else ""
+        return self._analyze_prompt(self._build_prompt(pages, purpose))
+    
+    def _build_prompt(self, pages: List[Dict], purpose: str) -> str:
+        """Build the AI prompt for a batch of pages"""
+        # Empty pages would only spend budget on headers
+        pages = [page for page in pages if page.get('content', '').strip()]
         
-        combined_content = ""
-        max_total_chars = 700000  # Conservative limit for Claude's context
-        chars_per_page = max_total_chars // len(pages)  # Distribute evenly
+        # Combine page content - short pages are kept whole and the rest of the
+        # token budget is shared between the pages that don't fit
+        parts: List[str] = []
+        budgets = self._allocate_page_budgets(pages)
         
-        for i, page in enumerate(pages, 1):
-            combined_content += f"\n\n{'='*80}\nPAGE {i}: {page['filename']}\n{'='*80}\n"
+        for i, (page, budget) in enumerate(zip(pages, budgets), 1):
+            header = f"\n\n{SEP}\nPAGE {i}: {page['filename']}\n{SEP}\n"
             
-            # Use as much content as we can fit per page
             page_content = page['content']
-            if len(page_content) > chars_per_page:
+            max_chars = budget * CHARS_PER_TOKEN
+            if len(page_content) > max_chars:
                 # Smart truncation: prioritize content with dates and events
                 # Take first 60% and last 40% to capture intro and conclusions
-                first_part = int(chars_per_page * 0.6)
-                last_part = int(chars_per_page * 0.4)
+                first_part = int(max_chars * 0.6)
+                last_part = int(max_chars * 0.4)
                 page_content = page_content[:first_part] + "\n\n[...middle section truncated...]\n\n" + page_content[-last_part:]
             
-            combined_content += page_content
+            parts.extend((header, page_content))
+        
+        combined_content = "".join(parts)
         
         if purpose == "events":
             prompt = f"""Analyze the following pages from the CWCki (a wiki about Chris Chan) and extract chronological events.
@@ -127,53 +344,89 @@ Write a well-structured summary that is objective and factual. Use markdown form
 Content to analyze:
 {combined_content}
 """
+        return prompt
+    
+    def _analyze_prompt(self, prompt: str) -> str:
+        """Send a prompt to the AI, answering repeats from the in-memory and on-disk cache"""
+        cache_key = self._cache_key(prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        response = self._call_with_retry(prompt)
+        self._cache_put(cache_key, response)
+        return response
+    
+    def _call_with_retry(self, prompt: str) -> str:
+        """Call the AI with backoff on transient errors, reusing the already-built prompt"""
+        retryable_errors = [
+            'UnrecognizedClientException',  # AWS credential issues
+            'ExpiredTokenException',        # Expired AWS credentials - MUST RETRY
+            'ThrottlingException',          # Rate limiting
+            'ServiceUnavailableException',  # Temporary unavailability
+            'InternalServerError',          # Server issues
+            'TimeoutError',                 # Timeout (including our own per-call timeout)
+            'ConnectionError'               # Network issues
+        ]
         
+        for attempt in range(self.max_retries + 1):
+            try:
+                agent_result = self._call_agent(prompt)
+                
+                # Extract text content from AgentResult object
+                if hasattr(agent_result, 'content'):
+                    # AgentResult object - extract the content
+                    response = agent_result.content
+                elif hasattr(agent_result, 'text'):
+                    # Alternative attribute name
+                    response = agent_result.text
+                elif isinstance(agent_result, str):
+                    # Already a string
+                    response = agent_result
+                else:
+                    # Try to convert to string
+                    response = str(agent_result)
+                
+                return response
+                
+            except Exception as e:
+                error_type = type(e).__name__
+                error_msg = str(e)
+                
+                # Check if error is retryable
+                is_retryable = any(err in error_type or err in error_msg for err in retryable_errors)
+                if 'ThrottlingException' in error_type or 'ThrottlingException' in error_msg:
+                    with self._stats_lock:
+                        self.throttle_events += 1
+                
+                if is_retryable and attempt < self.max_retries:
+                    # Capped exponential backoff plus jitter so concurrent batches don't retry in lockstep
+                    delay = min(self.max_retry_delay, self.retry_delay * (2 ** attempt))
+                    delay += random.uniform(0, min(4, self.retry_delay))
+                    logger.warning(f"AI call failed ({error_type}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                    time.sleep(delay)
+                else:
+                    logger.error(f"AI call failed permanently: {error_type}: {error_msg}")
+                    # Raise exception instead of returning empty data
+                    raise Exception(f"Batch analysis failed after {self.max_retries} retries: {error_type}: {error_msg}")
+    
+    def _call_agent(self, prompt: str):
+        """Call this thread's agent, giving up if it does not answer within call_timeout"""
+        agent = self._get_agent()
+        executor = ThreadPoolExecutor(max_workers=1)
         try:
-            agent_result = self.agent(prompt)
-            
-            # Extract text content from AgentResult object
-            if hasattr(agent_result, 'content'):
-                # AgentResult object - extract the content
-                response = agent_result.content
-            elif hasattr(agent_result, 'text'):
-                # Alternative attribute name
-                response = agent_result.text
-            elif isinstance(agent_result, str):
-                # Already a string
-                response = agent_result
-            else:
-                # Try to convert to string
-                response = str(agent_result)
-            
-            return response
-            
-        except Exception as e:
-            error_type = type(e).__name__
-            error_msg = str(e)
-            
-            # Check if error is retryable
-            retryable_errors = [
-                'UnrecognizedClientException',  # AWS credential issues
-                'ExpiredTokenException',        # Expired AWS credentials - MUST RETRY
-                'ThrottlingException',          # Rate limiting
-                'ServiceUnavailableException',  # Temporary unavailability
-                'InternalServerError',          # Server issues
-                'TimeoutError',                 # Timeout
-                'ConnectionError'               # Network issues
-            ]
-            
-            is_retryable = any(err in error_type or err in error_msg for err in retryable_errors)
-            
-            if is_retryable and retry_count < self.max_retries:
-                # Exponential backoff
-                delay = self.retry_delay * (2 ** retry_count)
-                logger.warning(f"AI call failed ({error_type}), retrying in {delay}s (attempt {retry_count + 1}/{self.max_retries})")
-                time.sleep(delay)
-                return self.analyze_page_batch(pages, purpose, retry_count + 1)
-            else:
-                logger.error(f"AI call failed permanently: {error_type}: {error_msg}")
-                # Raise exception instead of returning empty data
-                raise Exception(f"Batch analysis failed after {self.max_retries} retries: {error_type}: {error_msg}")
+            return executor.submit(agent, prompt).result(timeout=self.call_timeout)
+        except FutureTimeoutError:
+            # The hung call still owns that agent, so the retry gets a fresh one
+            self._local.agent = None
+            raise TimeoutError(f"AI call did not complete within {self.call_timeout}s")
+        finally:
+            # Never wait on a hung call - let its thread finish in the background
+            executor.shutdown(wait=False)
+    
+    async def analyze_page_batch_async(self, pages: List[Dict], purpose: str = "events") -> str:
+        """Run analyze_page_batch in a worker thread so several batches can be in flight"""
+        return await asyncio.to_thread(self.analyze_page_batch, pages, purpose)
     
     def generate_timeline(self, output_file: str = "timeline.json"):
         """Generate comprehensive timeline from all pages with checkpoint support"""
@@ -182,135 +435,36 @@ Content to analyze:
         print("="*80)
         
         pages = self.load_all_pages()
-        checkpoint_file = self.data_dir / "timeline_checkpoint.json"
+        events_log = self.data_dir / "timeline_events.jsonl"
+        meta_file = self.data_dir / "timeline_meta.json"
         
         # Try to load existing checkpoint
-        all_events = []
-        start_batch = 0
-        
-        if checkpoint_file.exists():
-            try:
-                with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                    checkpoint = json.load(f)
-                all_events = checkpoint.get('events', [])
-                failed_batches = checkpoint.get('failed_batches', [])
-                start_batch = checkpoint.get('last_batch', 0)
-                
-                # If there are failed batches, restart from the first failed one
-                if failed_batches:
-                    start_batch = min(failed_batches) - 1  # Start from first failed batch
-                    logger.info(f"✅ Resumed from checkpoint with {len(failed_batches)} failed batches")
-                    logger.info(f"   Events collected: {len(all_events)}")
-                    logger.info(f"   Retrying from batch: {start_batch + 1} (first failed)")
-                else:
-                    logger.info(f"✅ Resumed from checkpoint:")
-                    logger.info(f"   Events collected: {len(all_events)}")
-                    logger.info(f"   Starting from batch: {start_batch + 1}")
-            except Exception as e:
-                logger.warning(f"Could not load checkpoint: {e}")
-                start_batch = 0
-                all_events = []
-                failed_batches = []
-        else:
-            failed_batches = []
+        all_events, completed_batches, failed_batches = self._load_timeline_checkpoint(events_log, meta_file)
         
         # Process in batches - Optimized for maximum content coverage
         batch_size = 5  # 99%+ coverage: ~140K chars per page
         total_batches = (len(pages) + batch_size - 1) // batch_size
+        pending_batches = [n for n in range(1, total_batches + 1) if n not in completed_batches]
         
         print(f"Processing {len(pages)} pages in {total_batches} batches of {batch_size}")
+        print(f"Running {self.initial_concurrency} batches concurrently (adapts up to {self.max_concurrency})")
         if failed_batches:
             print(f"Retrying {len(failed_batches)} previously failed batches")
         print("")
         
-        # Use progress bar for clean output
-        with tqdm(total=total_batches, desc="Analyzing batches", initial=start_batch,
-                  bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]') as pbar:
-            
-            for i in range(start_batch * batch_size, len(pages), batch_size):
-                batch_num = i // batch_size
-                batch = pages[i:i+batch_size]
-                
-                # Update progress bar description
-                pbar.set_postfix({'events': len(all_events), 'failed': len(failed_batches)})
-                
-                try:
-                    result = self.analyze_page_batch(batch, purpose="events")
-                    
-                    # Parse JSON response
-                    try:
-                        # Extract JSON from markdown code blocks if present
-                        json_match = re.search(r'```json\s*(\{.*?\})\s*```', result, re.DOTALL)
-                        if json_match:
-                            result = json_match.group(1)
-                        
-                        events_data = json.loads(result)
-                        if 'events' in events_data:
-                            all_events.extend(events_data['events'])
-                            
-                            # Remove from failed list if it was there (successful retry)
-                            if (batch_num + 1) in failed_batches:
-                                failed_batches.remove(batch_num + 1)
-                            
-                            # Save checkpoint every 5 batches
-                            if (batch_num + 1) % 5 == 0:
-                                checkpoint_data = {
-                                    'events': all_events,
-                                    'last_batch': batch_num + 1,
-                                    'total_batches': total_batches,
-                                    'failed_batches': failed_batches,
-                                    'last_updated': datetime.now().isoformat()
-                                }
-                                with open(checkpoint_file, 'w', encoding='utf-8') as f:
-                                    json.dump(checkpoint_data, f, indent=2, ensure_ascii=False)
-                                
-                    except json.JSONDecodeError as e:
-                        if (batch_num + 1) not in failed_batches:
-                            failed_batches.append(batch_num + 1)
-                        # Only log to file, not console
-                        logger.info(f"Parse error batch {batch_num + 1}: {str(e)[:50]}")
-                        
-                except Exception as e:
-                    if (batch_num + 1) not in failed_batches:
-                        failed_batches.append(batch_num + 1)
-                    # Print to console only for critical errors
-                    tqdm.write(f"❌ Batch {batch_num + 1} failed: {str(e)[:80]}")
-                    # Save checkpoint with failure info (don't increment last_batch on failure)
-                    checkpoint_data = {
-                        'events': all_events,
-                        'last_batch': batch_num,  # Don't increment on failure
-                        'total_batches': total_batches,
-                        'failed_batches': failed_batches,
-                        'last_updated': datetime.now().isoformat()
-                    }
-                    with open(checkpoint_file, 'w', encoding='utf-8') as f:
-                        json.dump(checkpoint_data, f, indent=2, ensure_ascii=False)
-                
-                pbar.update(1)
+        asyncio.run(self._run_batches(pages, batch_size, pending_batches, total_batches,
+                                      all_events, completed_batches, failed_batches, events_log, meta_file))
         
         # Sort events chronologically
-        def parse_date_for_sort(date_str):
-            try:
-                if len(date_str) == 4:  # Just year
-                    return (int(date_str), 1, 1)
-                elif len(date_str) == 7:  # YYYY-MM
-                    parts = date_str.split('-')
-                    return (int(parts[0]), int(parts[1]), 1)
-                else:  # Full date
-                    parts = date_str.split('-')
-                    return (int(parts[0]), int(parts[1]), int(parts[2]))
-            except:
-                return (9999, 1, 1)  # Put unparseable dates at the end
-        
-        all_events.sort(key=lambda x: parse_date_for_sort(x.get('date', '9999')))
+        all_events.sort(key=_chronological_key)
         
         # Report on completion status
         if failed_batches:
             logger.warning(f"\n⚠️  Timeline generation INCOMPLETE!")
             logger.warning(f"   Successfully processed: {total_batches - len(failed_batches)}/{total_batches} batches")
-            logger.warning(f"   Failed batches: {len(failed_batches)} - {failed_batches[:10]}{'...' if len(failed_batches) > 10 else ''}")
+            logger.warning(f"   Failed batches: {len(failed_batches)} - {sorted(failed_batches)[:10]}{'...' if len(failed_batches) > 10 else ''}")
             logger.warning(f"   Events collected: {len(all_events)}")
-            logger.warning(f"\n   Checkpoint preserved at: {checkpoint_file}")
+            logger.warning(f"\n   Checkpoint preserved at: {events_log}")
             logger.warning(f"   Run the analyzer again to retry failed batches")
         else:
             logger.info(f"\n✅ Timeline generation COMPLETE!")
@@ -319,18 +473,17 @@ Content to analyze:
         
         # Save timeline
         output_path = self.data_dir / output_file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                'total_events': len(all_events),
-                'generated_at': datetime.now().isoformat(),
-                'complete': len(failed_batches) == 0,
-                'failed_batches': failed_batches,
-                'events': all_events
-            }, f, indent=2, ensure_ascii=False)
+        json_io.dump({
+            'total_events': len(all_events),
+            'generated_at': datetime.now().isoformat(),
+            'complete': len(failed_batches) == 0,
+            'failed_batches': sorted(failed_batches),
+            'events': all_events
+        }, output_path)
         
         # Keep checkpoint file (useful for future reference)
-        if checkpoint_file.exists():
-            logger.info(f"📝 Checkpoint file preserved at: {checkpoint_file}")
+        if events_log.exists():
+            logger.info(f"📝 Checkpoint file preserved at: {events_log}")
         
         logger.info(f"\n{'='*80}")
         logger.info(f"Timeline generated with {len(all_events)} events")
@@ -341,39 +494,190 @@ Content to analyze:
         
         return all_events
     
+    async def _run_batches(self, pages: List[Dict], batch_size: int, pending_batches: List[int],
+                           total_batches: int, all_events: List[Dict], completed_batches: set,
+                           failed_batches: set, events_log: Path, meta_file: Path):
+        """Analyze pending batches concurrently, checkpointing in completion order"""
+        self._limiter = AdaptiveConcurrencyLimiter(self.initial_concurrency, self.max_concurrency,
+                                                   self.latency_target)
+        
+        async def bounded(batch_num: int):
+            start = (batch_num - 1) * batch_size
+            await self._limiter.acquire()
+            started_at = time.monotonic()
+            throttles_before = self.throttle_events
+            try:
+                result = await self.analyze_page_batch_async(pages[start:start + batch_size], purpose="events")
+                outcome = (batch_num, result, None)
+            except Exception as e:
+                outcome = (batch_num, None, e)
+            finally:
+                await self._limiter.release()
+            await self._limiter.record(started_at, time.monotonic() - started_at,
+                                       self.throttle_events > throttles_before)
+            return outcome
+        
+        def save_meta():
+            self._save_timeline_meta(meta_file, total_batches, failed_batches)
+        
+        def fail_batch(batch_num: int):
+            failed_batches.add(batch_num)
+            # Don't let the cache replay a bad response on the next run
+            start = (batch_num - 1) * batch_size
+            self.invalidate_cached_batch(pages[start:start + batch_size], purpose="events")
+            save_meta()
+        
+        # Use progress bar for clean output
+        with tqdm(total=total_batches, desc="Analyzing batches", initial=total_batches - len(pending_batches),
+                  bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]') as pbar:
+            
+            for next_done in asyncio.as_completed([bounded(n) for n in pending_batches]):
+                batch_num, result, error = await next_done
+                
+                if error is None:
+                    # Parse JSON response
+                    try:
+                        # Extract JSON from markdown code blocks if present
+                        json_match = _JSON_BLOCK_RE.search(result)
+                        if json_match:
+                            result = json_match.group(1)
+                        
+                        events_data = json_io.loads(result)
+                        events = events_data.get('events') if isinstance(events_data, dict) else None
+                        if not isinstance(events, list):
+                            raise ValueError("response has no 'events' list")
+                        
+                        # Append only this batch's events - the log line marks it done
+                        self._append_timeline_events(events_log, [batch_num], events)
+                        all_events.extend(events)
+                        completed_batches.add(batch_num)
+                        
+                        # Remove from failed list if it was there (successful retry)
+                        if batch_num in failed_batches:
+                            failed_batches.discard(batch_num)
+                            save_meta()
+                                
+                    except ValueError as e:  # Includes json_io.JSONDecodeError
+                        fail_batch(batch_num)
+                        # Only log to file, not console
+                        logger.info(f"Parse error batch {batch_num}: {str(e)[:50]}")
+                    
+                    except Exception as e:
+                        fail_batch(batch_num)
+                        # Print to console only for critical errors
+                        tqdm.write(f"❌ Batch {batch_num} failed: {str(e)[:80]}")
+                else:
+                    failed_batches.add(batch_num)
+                    # Print to console only for critical errors
+                    tqdm.write(f"❌ Batch {batch_num} failed: {str(error)[:80]}")
+                    # Save checkpoint with failure info
+                    save_meta()
+                
+                pbar.set_postfix({'events': len(all_events), 'failed': len(failed_batches),
+                                  'concurrency': self._limiter.limit})
+                pbar.update(1)
+        
+        save_meta()
+    
+    def _load_timeline_checkpoint(self, events_log: Path, meta_file: Path) -> Tuple[List[Dict], set, set]:
+        """Rebuild events, completed batches and failed batches from the timeline checkpoint files"""
+        all_events = []
+        completed_batches = set()
+        failed_batches = set()
+        
+        if not events_log.exists():
+            # Migrate a checkpoint written before the events log existed
+            legacy_checkpoint = self.data_dir / "timeline_checkpoint.json"
+            if legacy_checkpoint.exists():
+                try:
+                    checkpoint = json_io.load(legacy_checkpoint)
+                    failed_batches = set(checkpoint.get('failed_batches', []))
+                    if 'completed_batches' in checkpoint:
+                        done = set(checkpoint['completed_batches'])
+                    else:
+                        # Older sequential checkpoints only recorded how far they got
+                        done = set(range(1, checkpoint.get('last_batch', 0) + 1)) - failed_batches
+                    self._append_timeline_events(events_log, sorted(done), checkpoint.get('events', []))
+                    self._save_timeline_meta(meta_file, checkpoint.get('total_batches', 0), failed_batches)
+                    logger.info(f"Migrated {legacy_checkpoint.name} to {events_log.name}")
+                except Exception as e:
+                    logger.warning(f"Could not migrate legacy checkpoint: {e}")
+        
+        if events_log.exists():
+            try:
+                with open(events_log, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json_io.loads(line)
+                        except json_io.JSONDecodeError:
+                            # A torn final line from an interrupted write - that batch reruns
+                            continue
+                        completed_batches.update(record['batches'])
+                        all_events.extend(record['events'])
+                
+                if meta_file.exists():
+                    failed_batches = set(json_io.load(meta_file).get('failed_batches', []))
+                
+                logger.info(f"✅ Resumed from checkpoint:")
+                logger.info(f"   Events collected: {len(all_events)}")
+                logger.info(f"   Batches completed: {len(completed_batches)}")
+                if failed_batches:
+                    logger.info(f"   Retrying {len(failed_batches)} failed batches")
+            except Exception as e:
+                logger.warning(f"Could not load checkpoint: {e}")
+                all_events = []
+                completed_batches = set()
+                failed_batches = set()
+        
+        return all_events, completed_batches, failed_batches
+    
+    def _append_timeline_events(self, events_log: Path, batches: List[int], events: List[Dict]):
+        """Append one completed batch (its number and events) to the events log"""
+        with open(events_log, 'a', encoding='utf-8') as f:
+            f.write(json_io.dumps({'batches': batches, 'events': events}) + '\n')
+    
+    def _save_timeline_meta(self, meta_file: Path, total_batches: int, failed_batches: set):
+        """Atomically rewrite the small timeline checkpoint metadata file"""
+        json_io.dump({
+            'total_batches': total_batches,
+            'failed_batches': sorted(failed_batches),
+            'last_updated': datetime.now().isoformat()
+        }, meta_file)
+    
     def create_timeline_markdown(self, events: List[Dict]):
         """Create markdown formatted timeline"""
         md_path = self.data_dir / "timeline.md"
         
-        with open(md_path, 'w', encoding='utf-8') as f:
-            f.write("# Chris Chan Timeline\n\n")
-            f.write(f"*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n")
-            f.write(f"Total Events: {len(events)}\n\n")
-            f.write("---\n\n")
-            
-            # Group by year
-            events_by_year = defaultdict(list)
-            for event in events:
-                year = event.get('date', '')[:4] if event.get('date') else 'Unknown'
-                events_by_year[year].append(event)
+        # Build the document in memory and write it once - far fewer syscalls than per-line writes
+        buf: List[str] = []
+        append = buf.append
+        
+        append("# Chris Chan Timeline\n\n")
+        append(f"*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n")
+        append(f"Total Events: {len(events)}\n\n")
+        append("---\n\n")
+        
+        # Group by year - events are already chronological, so this stable sort is
+        # near-linear and only moves the few whose dates didn't parse
+        for year, year_events in groupby(sorted(events, key=_year_key), key=_year_key):
+            append(f"## {year}\n\n")
             
-            for year in sorted(events_by_year.keys()):
-                f.write(f"## {year}\n\n")
-                
-                for event in events_by_year[year]:
-                    date = event.get('date', 'Unknown date')
-                    desc = event.get('description', 'No description')
-                    source = event.get('source', 'Unknown source')
-                    category = event.get('category', 'General')
-                    
-                    f.write(f"### {date}\n")
-                    f.write(f"**Category:** {category}  \n")
-                    f.write(f"**Event:** {desc}  \n")
-                    if event.get('people'):
-                        f.write(f"**People:** {', '.join(event['people'])}  \n")
-                    f.write(f"**Source:** {source}\n\n")
+            for event in year_events:
+                date = event.get('date', 'Unknown date')
+                desc = event.get('description', 'No description')
+                source = event.get('source', 'Unknown source')
+                category = event.get('category', 'General')
                 
-                f.write("\n")
+                append(f"### {date}\n")
+                append(f"**Category:** {category}  \n")
+                append(f"**Event:** {desc}  \n")
+                if event.get('people'):
+                    append(f"**People:** {', '.join(event['people'])}  \n")
+                append(f"**Source:** {source}\n\n")
+            
+            append("\n")
+        
+        md_path.write_text("".join(buf), encoding='utf-8')
         
         print(f"Markdown timeline saved to: {md_path}")
     
@@ -401,19 +705,13 @@ Content to analyze:
             print("⚠️  Warning: timeline.json not found. Generate timeline first.")
             return None
         
-        with open(timeline_path, 'r', encoding='utf-8') as f:
-            timeline_data = json.load(f)
+        timeline_data = json_io.load(timeline_path)
         
         events = timeline_data.get('events', [])
         
         # Group events by decade for structured analysis
-        events_by_decade = defaultdict(list)
-        for event in events:
-            date = event.get('date', '0000')
-            year = date[:4]
-            if year.isdigit():
-                decade = (int(year) // 10) * 10
-                events_by_decade[decade].append(event)
+        dated_events = sorted((e for e in events if _decade_key(e) is not None), key=_decade_key)
+        events_by_decade = {decade: list(group) for decade, group in groupby(dated_events, key=_decade_key)}
         
         # Generate summary from timeline events (much more accurate)
         print(f"\nAnalyzing {len(events)} events organized by decade...")
@@ -440,7 +738,7 @@ Write in an objective, encyclopedic style. Focus on factual documentation while
 
 Timeline data ({len(events)} events):
 
-{json.dumps(list(events_by_decade.items())[:20], indent=2)}
+{json_io.dumps(list(events_by_decade.items())[:20], indent=True)}
 
 [Note: Full timeline has {len(events)} events spanning {min(events_by_decade.keys())} to {max(events_by_decade.keys())}]
 
@@ -448,7 +746,10 @@ Generate a comprehensive, well-structured biographical summary in markdown forma
 Do NOT include a title or header at the beginning - start directly with the content."""
         
         try:
-            summary_text = self.analyze_page_batch([{'filename': 'timeline', 'content': prompt}], purpose="summary")
+            report_pages = [{'filename': 'timeline', 'content': prompt}]
+            # summary.md is missing, so the report is being (re)generated - drop any cached answer
+            self.invalidate_cached_batch(report_pages, purpose="summary")
+            summary_text = self.analyze_page_batch(report_pages, purpose="summary")
             
             # Remove any leading headers from AI response (in case it added one despite instructions)
             lines = summary_text.strip().split('\n')
@@ -469,8 +770,8 @@ Do NOT include a title or header at the beginning - start directly with the cont
 """
             
             output_path = self.data_dir / output_file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(final_summary)
+            # Atomic - a summary.md over 1KB is taken as done, so never leave half of one
+            json_io.write_atomic(final_summary.encode('utf-8'), output_path)
             
             print(f"\n{'='*80}")
             print(f"Summary generated from {len(events)} timeline events!")
@@ -506,8 +807,7 @@ Do NOT include a title or header at the beginning - start directly with the cont
             print("⚠️  Warning: timeline.json not found. Generate timeline first.")
             return None
         
-        with open(timeline_path, 'r', encoding='utf-8') as f:
-            timeline_data = json.load(f)
+        timeline_data = json_io.load(timeline_path)
         
         events = timeline_data.get('events', [])
         
@@ -556,7 +856,7 @@ Things by OTHERS:
 - Third-party content creators profiting from Chris's suffering
 
 TIMELINE EVENTS TO ANALYZE:
-{json.dumps(events[:500], indent=2)}
+{json_io.dumps(events[:500], indent=True)}
 ...and {len(events) - 500} more events
 
 OUTPUT REQUIREMENTS:
@@ -569,7 +869,10 @@ OUTPUT REQUIREMENTS:
 BEGIN YOUR NUMBERED LIST NOW:"""
         
         try:
-            worst_things_text = self.analyze_page_batch([{'filename': 'timeline', 'content': prompt}], purpose="worst_things_analysis")
+            report_pages = [{'filename': 'timeline', 'content': prompt}]
+            # worst_things.md is missing, so the report is being (re)generated - drop any cached answer
+            self.invalidate_cached_batch(report_pages, purpose="worst_things_analysis")
+            worst_things_text = self.analyze_page_batch(report_pages, purpose="worst_things_analysis")
             
             # Remove any leading headers from AI response
             lines = worst_things_text.strip().split('\n')
@@ -588,8 +891,7 @@ BEGIN YOUR NUMBERED LIST NOW:"""
 *Source: [CWCki](https://sonichu.com/cwcki)*
 """
             
-            with open(list_path, 'w', encoding='utf-8') as f:
-                f.write(final_content)
+            json_io.write_atomic(final_content.encode('utf-8'), list_path)  # Same 1KB skip check as summary.md
             
             print(f"\n{'='*80}")
             print(f"Worst things committed list generated from {len(events)} timeline events!")
@@ -601,8 +903,25 @@ BEGIN YOUR NUMBERED LIST NOW:"""
             logger.error(f"Failed to generate worst things committed list: {e}")
             return None
 
-    def link_media_to_events(self, output_file: str = "timeline_with_media.json"):
-        """Link media to timeline events with checkpoint support"""
+    async def generate_reports_async(self) -> Tuple[Optional[str], Optional[str]]:
+        """Generate the summary and the worst things list at the same time - each is
+        one independent AI call over the finished timeline"""
+        summary, worst_things = await asyncio.gather(
+            asyncio.to_thread(self.generate_summary),
+            asyncio.to_thread(self.generate_worst_things_list),
+            return_exceptions=True
+        )
+        for name, result in (("summary", summary), ("worst things list", worst_things)):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to generate {name}: {result}")
+        return (None if isinstance(summary, BaseException) else summary,
+                None if isinstance(worst_things, BaseException) else worst_things)
+
+    def link_media_to_events(self, output_file: str = "timeline_with_media.json", media_data: Optional[Dict] = None):
+        """Link media to timeline events with checkpoint support
+        
+        media_data is the parsed media_index.json, for callers that have already loaded it
+        """
         print("\n" + "="*80)
         print("LINKING MEDIA TO TIMELINE EVENTS")
         print("="*80)
@@ -613,29 +932,40 @@ BEGIN YOUR NUMBERED LIST NOW:"""
             logger.error("Timeline not found. Generate timeline first.")
             return None
         
-        with open(timeline_path, 'r', encoding='utf-8') as f:
-            timeline_data = json.load(f)
-        
-        events = timeline_data.get('events', [])
-        
         # Load media index
-        media_index_path = self.data_dir / "media" / "media_index.json"
-        if not media_index_path.exists():
-            logger.warning("Media index not found. Skipping media linking.")
-            return None
-        
-        with open(media_index_path, 'r', encoding='utf-8') as f:
-            media_data = json.load(f)
+        if media_data is None:
+            media_index_path = self.data_dir / "media" / "media_index.json"
+            if not media_index_path.exists():
+                logger.warning("Media index not found. Skipping media linking.")
+                return None
+            
+            media_data = json_io.load(media_index_path)
         
-        # Create page-to-media mapping
+        # Create page-to-media mapping, deduplicated once per page rather than per event
+        # (the same image may appear multiple times on a page)
         page_media = {}
         for page in media_data.get('pages', []):
+            unique_images = {}
+            for img in page['images']:
+                img_url = img.get('url', '')
+                if img_url and img_url not in unique_images:
+                    unique_images[img_url] = img
+            
+            unique_videos = {}
+            for video in page['videos']:
+                video_url = video.get('url', '')
+                if video_url and video_url not in unique_videos:
+                    unique_videos[video_url] = video
+            
             page_media[page['safe_filename']] = {
-                'images': page['images'],
-                'videos': page['videos']
+                'images': list(unique_images.values()),
+                'videos': list(unique_videos.values())
             }
         
-        print(f"\nLinking media to {len(events)} events...")
+        # Events are streamed from timeline.json rather than loaded up front
+        total_events, events = self._stream_timeline_events(timeline_path)
+        
+        print(f"\nLinking media to {total_events} events...")
         print(f"Media available from {len(page_media)} pages\n")
         
         # Checkpoint support
@@ -645,56 +975,28 @@ BEGIN YOUR NUMBERED LIST NOW:"""
         
         if checkpoint_file.exists():
             try:
-                with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                    checkpoint = json.load(f)
+                checkpoint = json_io.load(checkpoint_file)
                 events_with_media = checkpoint.get('events_with_media', [])
                 start_idx = len(events_with_media)
                 logger.info(f"✅ Resumed from checkpoint: {start_idx} events linked")
             except Exception as e:
                 logger.warning(f"Could not load checkpoint: {e}")
         
+        # Sanitize each distinct source once - there are far fewer sources than events
+        safe_sources: Dict[str, str] = {}
+        
         # Link media to events with progress bar
         checkpoint_interval = 100
         events_since_checkpoint = 0
         
-        for idx in tqdm(range(start_idx, len(events)), desc="Linking media",
-                       initial=start_idx, total=len(events)):
-            event = events[idx]
-            
+        for event in tqdm(islice(events, start_idx, None), desc="Linking media",
+                          initial=start_idx, total=total_events):
             # Get media from source page
             source = event.get('source', '')
-            safe_source = re.sub(r'[^\w\s-]', '_', source)[:100]
-            
-            event_media = {
-                'images': [],
-                'videos': []
-            }
-            
-            if safe_source in page_media:
-                source_media = page_media[safe_source]
-                
-                # Deduplicate images by URL (same image may appear multiple times on a page)
-                seen_urls = set()
-                unique_images = []
-                for img in source_media.get('images', []):
-                    img_url = img.get('url', '')
-                    if img_url and img_url not in seen_urls:
-                        seen_urls.add(img_url)
-                        unique_images.append(img)
-                
-                # Deduplicate videos by URL
-                seen_video_urls = set()
-                unique_videos = []
-                for video in source_media.get('videos', []):
-                    video_url = video.get('url', '')
-                    if video_url and video_url not in seen_video_urls:
-                        seen_video_urls.add(video_url)
-                        unique_videos.append(video)
-                
-                event_media = {
-                    'images': unique_images,
-                    'videos': unique_videos
-                }
+            safe_source = safe_sources.get(source)
+            if safe_source is None:
+                safe_source = safe_sources[source] = _SAFE_FN_RE.sub('_', source)[:100]
+            event_media = page_media.get(safe_source, EMPTY_MEDIA)
             
             # Add media to event
             events_with_media.append({
@@ -710,29 +1012,47 @@ BEGIN YOUR NUMBERED LIST NOW:"""
                     'events_with_media': events_with_media,
                     'last_updated': datetime.now().isoformat()
                 }
-                with open(checkpoint_file, 'w', encoding='utf-8') as f:
-                    json.dump(checkpoint_data, f, indent=2, ensure_ascii=False)
+                json_io.dump(checkpoint_data, checkpoint_file, indent=False)  # Machine-read only
                 events_since_checkpoint = 0
         
         # Save final timeline with media
         output_path = self.data_dir / output_file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                'total_events': len(events_with_media),
-                'events_with_media': sum(1 for e in events_with_media if e['media']['images'] or e['media']['videos']),
-                'generated_at': datetime.now().isoformat(),
-                'events': events_with_media
-            }, f, indent=2, ensure_ascii=False)
+        linked_count = sum(1 for e in events_with_media if e['media']['images'] or e['media']['videos'])
+        json_io.dump({
+            'total_events': len(events_with_media),
+            'events_with_media': linked_count,
+            'generated_at': datetime.now().isoformat(),
+            'events': events_with_media
+        }, output_path)
         
         # Keep checkpoint as completion marker - allows skipping on reruns
         if checkpoint_file.exists():
             print(f"\n📝 Checkpoint preserved (marks linking as complete)")
         
         print(f"\n✅ Media linking complete!")
-        print(f"   Events with media: {sum(1 for e in events_with_media if e['media']['images'] or e['media']['videos'])}")
+        print(f"   Events with media: {linked_count}")
         print(f"   Saved to: {output_path}")
         
         return events_with_media
+    
+    def _stream_timeline_events(self, timeline_path: Path) -> Tuple[int, Iterator[Dict]]:
+        """Return the event count and an iterator over timeline.json's events,
+        parsed incrementally when ijson is installed"""
+        if ijson is None:
+            events = json_io.load(timeline_path).get('events', [])
+            return len(events), iter(events)
+        
+        with open(timeline_path, 'rb') as f:
+            # total_events is written ahead of the events array, so this stops early
+            total = next(ijson.items(f, 'total_events'), None)
+        
+        def events() -> Iterator[Dict]:
+            with open(timeline_path, 'rb') as f:
+                yield from ijson.items(f, 'events.item', use_float=True)
+        
+        if total is None:
+            total = sum(1 for _ in events())
+        return int(total), events()
 
 def main():
     analyzer = CWCkiAnalyzer()
@@ -754,8 +1074,7 @@ def main():
     
     if media_index_path.exists():
         try:
-            with open(media_index_path, 'r') as f:
-                media_data = json.load(f)
+            media_data = json_io.load(media_index_path)
             if media_data.get('total_pages', 0) == 0:
                 print("\n⚠️  Media index is empty, skipping media linking")
                 skip_media = True
@@ -766,7 +1085,7 @@ def main():
         skip_media = True
     
     if not skip_media:
-        timeline_with_media = analyzer.link_media_to_events()
+        timeline_with_media = analyzer.link_media_to_events(media_data=media_data)
     
     # Generate summary
     summary = analyzer.generate_summary()
@@ -4,19 +4,31 @@ Extract media from already-scraped pages
 Processes raw_json files to download images and extract video URLs
 """
 
-import json
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import hashlib
 import re
-import time
 import sys
 import logging
+import multiprocessing
+import threading
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin, urlparse, urlsplit
+from lxml import etree, html as lxml_html
+
+try:
+    import ijson
+except ImportError:  # ijson is optional - without it media_index.json is loaded whole for its counts
+    ijson = None
+
+import json_io
+from rate_limit import RateLimiter
 
 # Set up logging
 logging.basicConfig(
@@ -29,83 +41,231 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Status lines of a quiet run (Step 2 in the background under run.py) - written to the log
+# file only, never the console, whatever handlers the root logger has
+status_logger = logging.getLogger(f'{__name__}.status')
+status_logger.setLevel(logging.INFO)
+status_logger.propagate = False
+if not status_logger.handlers:
+    _status_handler = logging.FileHandler('media_extraction.log', delay=True)
+    _status_handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s'))
+    status_logger.addHandler(_status_handler)
+
+# Compiled once - these run for every image on every page
+_HAS_CLASS = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+_FIGURE_ANCESTOR = etree.XPath("ancestor::figure[1]")
+_THUMBINNER_ANCESTOR = etree.XPath(f"ancestor::div[{_HAS_CLASS.format('thumbinner')}][1]")
+_FIGCAPTION = etree.XPath("(.//figcaption)[1]")
+_THUMBCAPTION = etree.XPath(f"(.//div[{_HAS_CLASS.format('thumbcaption')}])[1]")
+# Cheap probe for any tag we extract from - most pages are prose only
+_MEDIA_TAG_RE = re.compile(r'<(?:img|iframe|video)\b', re.IGNORECASE)
+# Image sources that are inline or not fetchable - never worth a download attempt
+_SKIP_SCHEMES = ('data:', 'blob:', 'javascript:', '#')
+# URLs made only of these characters (no query, fragment, whitespace or brackets)
+# resolve exactly as urljoin would by plain concatenation
+_PLAIN_URL_RE = re.compile(r"[A-Za-z0-9\-._~%!$&'()*+,;=:@/]*\Z")
+
+
+def _resolve_url(src: str, page_url: str, base_scheme: str, base_prefix: str) -> str:
+    """urljoin(page_url, src) with fast paths for absolute, protocol-relative and root-relative srcs"""
+    if _PLAIN_URL_RE.match(src):
+        if src.startswith(('http://', 'https://')):
+            host = src.split('//', 1)[1]
+            if host and host[0] != '/':
+                return src
+        elif src.startswith('//'):
+            if src[2:3] not in ('', '/'):
+                return f"{base_scheme}:{src}"
+        elif src.startswith('/') and '/.' not in src:
+            return base_prefix + src
+    return urljoin(page_url, src)
+
+
+def _url_suffix(url: str) -> str:
+    """Path(urlparse(url).path).suffix without building either object for plain http(s) URLs"""
+    if _PLAIN_URL_RE.match(url) and ';' not in url and '/.' not in url:
+        scheme_end = url.find('://')
+        if url[:scheme_end] in ('http', 'https'):
+            path = url[scheme_end + 3:].rstrip('/')
+            if '/' not in path:
+                return ''  # Bare host - no path at all
+            name = path[path.rfind('/') + 1:]
+            dot = name.rfind('.')
+            return name[dot:] if 0 < dot < len(name) - 1 else ''
+    return Path(urlparse(url).path).suffix
+
+def extract_media_from_html(html: str, page_url: str) -> tuple[List[Dict], List[Dict]]:
+    """Extract images and videos from HTML content"""
+    images = []
+    videos = []
+    if not _MEDIA_TAG_RE.search(html):
+        return images, videos  # Nothing to extract - skip the parse entirely
+    
+    try:
+        tree = lxml_html.fromstring(html)
+    except etree.ParserError:
+        return images, videos  # Empty document - nothing to extract
+    
+    # Resolve srcs against the page - split its URL once rather than per urljoin
+    base = urlsplit(page_url)
+    base_prefix = f"{base.scheme}://{base.netloc}"
+    
+    # Extract images
+    for img in tree.iter('img'):
+        src = img.get('src', '')
+        if src and not src.startswith(_SKIP_SCHEMES):
+            img_url = _resolve_url(src, page_url, base.scheme, base_prefix)
+            alt_text = img.get('alt', '')
+            title = img.get('title', '')
+            
+            # Get caption if in figure
+            caption = ''
+            parent = _FIGURE_ANCESTOR(img) or _THUMBINNER_ANCESTOR(img)
+            if parent:
+                caption_elem = _FIGCAPTION(parent[0]) or _THUMBCAPTION(parent[0])
+                if caption_elem:
+                    caption = caption_elem[0].text_content().strip()
+            
+            images.append({
+                'url': img_url,
+                'alt_text': alt_text,
+                'title': title,
+                'caption': caption
+            })
+    
+    # Extract videos
+    for iframe in tree.iter('iframe'):
+        src = iframe.get('src', '')
+        if 'youtube' in src or 'youtu.be' in src:
+            videos.append({
+                'type': 'youtube',
+                'url': src,
+                'embed_url': src
+            })
+    
+    for video in tree.iter('video'):
+        src = video.get('src', '')
+        if src:
+            videos.append({
+                'type': 'video',
+                'url': _resolve_url(src, page_url, base.scheme, base_prefix),
+                'poster': video.get('poster', '')
+            })
+    
+    return images, videos
+
+
+def parse_page(json_path: Path) -> Tuple[str, str, str, List[Dict], List[Dict]]:
+    """Load one raw page and extract its media - top-level so worker processes can run it"""
+    page_data = json_io.load(json_path)
+    page_url = page_data.get('url', '')
+    images, videos = extract_media_from_html(page_data.get('html_content', ''), page_url)
+    return page_data.get('title', ''), page_url, json_path.stem, images, videos
+
+
+def _parse_page_or_error(json_path: Path):
+    """parse_page for pool.map - a bad page comes back as an error instead of ending the map"""
+    try:
+        return parse_page(json_path), None
+    except Exception as e:
+        return None, e
+
+
 class MediaExtractor:
     def __init__(self, scraped_data_dir: str = "scraped_data"):
         self.data_dir = Path(scraped_data_dir)
         self.raw_json_dir = self.data_dir / "raw_json"
         self.media_dir = self.data_dir / "media"
         self.images_dir = self.media_dir / "images"
+        # Append-only log of processed pages (the resume source of truth) and its small counters file
+        self.index_log = self.data_dir / "media_extraction_index.jsonl"
+        self.checkpoint_file = self.data_dir / "media_extraction_checkpoint.json"
+        # The final index can be hundreds of MB - its counts are also kept in a tiny sidecar
+        self.media_index_file = self.media_dir / "media_index.json"
+        self.media_index_meta = self.media_dir / "media_index_meta.json"
         self.max_image_size = 10 * 1024 * 1024  # 10MB
+        # Set when another step owns the console - progress bars are hidden and status lines logged
+        self.quiet = False
+        # Set from another thread to stop after the current page - progress so far stays resumable
+        self.cancel_event = threading.Event()
         
         # Create directories
         self.images_dir.mkdir(parents=True, exist_ok=True)
         
-        # Session for downloads
+        self.download_workers = 8  # Images downloaded in parallel per page
+        self.parse_workers = os.cpu_count() or 1  # HTML parsing is CPU-bound - one process per core
+        self.parse_chunksize = 32  # Pages handed to a parse worker at a time
+        # Workers are spawned fresh - run.py extracts media while analyzer threads are busy,
+        # and forking a process that has other threads running can deadlock the child
+        self.parse_context = multiprocessing.get_context('spawn')
+        
+        # Session for downloads - keep-alive connections for every download thread, and
+        # transient CDN errors retried with backoff at the connection level
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'CWCki Research Bot/1.0 (Educational Purpose)'
         })
-        self.rate_limit_delay = 0.2  # 200ms between pages to avoid overwhelming server
+        adapter = HTTPAdapter(
+            pool_connections=16,  # Distinct hosts kept alive (wiki + image CDNs)
+            pool_maxsize=self.download_workers * 2,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.rate_limit_delay = 0.1  # Min spacing between image requests, shared by all download threads
+        self.rate_limiter = RateLimiter(self.rate_limit_delay)
+        # A HEAD before each GET only pays off when oversized images are common - decide
+        # from the first downloads whether to spend that extra round-trip
+        self.head_precheck_sample = 50
+        self.head_precheck_min_rate = 0.05
+        self._size_checks = 0
+        self._oversized = 0
+        self._size_lock = threading.Lock()
     
     def extract_media_from_html(self, html: str, page_url: str) -> tuple[List[Dict], List[Dict]]:
         """Extract images and videos from HTML content"""
-        soup = BeautifulSoup(html, 'lxml')
-        images = []
-        videos = []
-        
-        # Extract images
-        for img in soup.find_all('img'):
-            src = img.get('src', '')
-            if src and not src.startswith('data:'):
-                img_url = urljoin(page_url, src)
-                alt_text = img.get('alt', '')
-                title = img.get('title', '')
-                
-                # Get caption if in figure
-                caption = ''
-                parent = img.find_parent('figure') or img.find_parent('div', class_='thumbinner')
-                if parent:
-                    caption_elem = parent.find('figcaption') or parent.find('div', class_='thumbcaption')
-                    if caption_elem:
-                        caption = caption_elem.get_text().strip()
-                
-                images.append({
-                    'url': img_url,
-                    'alt_text': alt_text,
-                    'title': title,
-                    'caption': caption
-                })
-        
-        # Extract videos
-        for iframe in soup.find_all('iframe'):
-            src = iframe.get('src', '')
-            if 'youtube' in src or 'youtu.be' in src:
-                videos.append({
-                    'type': 'youtube',
-                    'url': src,
-                    'embed_url': src
-                })
-        
-        for video in soup.find_all('video'):
-            src = video.get('src', '')
-            if src:
-                videos.append({
-                    'type': 'video',
-                    'url': urljoin(page_url, src),
-                    'poster': video.get('poster', '')
-                })
-        
-        return images, videos
+        return extract_media_from_html(html, page_url)
+    
+    def _record_size_check(self, oversized: bool):
+        """Count a download attempt towards the HEAD precheck decision"""
+        with self._size_lock:
+            self._size_checks += 1
+            self._oversized += oversized
+    
+    def _use_head_precheck(self) -> bool:
+        """True once the sampled downloads show oversized images are frequent"""
+        with self._size_lock:
+            if self._size_checks < self.head_precheck_sample:
+                return False
+            return self._oversized >= self._size_checks * self.head_precheck_min_rate
     
     def download_image(self, img_url: str, output_path: Path) -> bool:
         """Download image with size check"""
         try:
+            # Reject oversized images from their headers alone, without opening the body
+            if self._use_head_precheck():
+                self.rate_limiter.wait()
+                try:
+                    head = self.session.head(img_url, timeout=10, allow_redirects=True)
+                    content_length = int(head.headers.get('content-length') or 0)
+                except (requests.exceptions.RequestException, ValueError):
+                    # The precheck is only an optimisation - a failed HEAD leaves it to the GET
+                    content_length = 0
+                if content_length > self.max_image_size:
+                    self._record_size_check(True)
+                    logger.debug(f"Skipping large image ({content_length/1024/1024:.1f}MB)")
+                    return False
+            
+            self.rate_limiter.wait()
             response = self.session.get(img_url, timeout=30, stream=True)
             response.raise_for_status()
             
             # Check size
             content_length = int(response.headers.get('content-length', 0))
-            if content_length > self.max_image_size:
+            oversized = content_length > self.max_image_size
+            self._record_size_check(oversized)
+            if oversized:
+                response.close()
                 logger.debug(f"Skipping large image ({content_length/1024/1024:.1f}MB)")
                 return False
             
@@ -119,183 +279,198 @@ class MediaExtractor:
             logger.debug(f"Download failed: {str(e)[:50]}")
             return False
     
+    def _status(self, message: str):
+        """Print a status line - or log it, when running quietly alongside another step"""
+        if self.quiet:
+            status_logger.info(message.strip())
+        else:
+            # flush so lines keep their place next to the tqdm bar on stderr
+            print(message, flush=True)
+    
     def extract_all_media(self):
         """Extract media from all scraped pages with checkpoint support"""
-        print("\n" + "="*80)
-        print("EXTRACTING MEDIA FROM SCRAPED PAGES")
-        print("="*80)
+        self._status("\n" + "="*80)
+        self._status("EXTRACTING MEDIA FROM SCRAPED PAGES")
+        self._status("="*80)
         
         # Count total raw JSON files to process
         json_files = list(self.raw_json_dir.glob("*.json"))
         total_pages_to_process = len(json_files)
         
         if total_pages_to_process == 0:
-            print("\n⚠️  No raw JSON files found in scraped_data/raw_json/")
-            print("   Please run the scraper first to download pages")
+            self._status("\n⚠️  No raw JSON files found in scraped_data/raw_json/")
+            self._status("   Please run the scraper first to download pages")
             return None
         
         # Check if media_index.json already exists and is complete
-        media_index_file = self.media_dir / "media_index.json"
+        media_index_file = self.media_index_file
         existing_media_data = None
         has_complete_media_index = False
         
         if media_index_file.exists():
             try:
-                print(f"\n🔍 Checking existing media_index.json...")
-                print(f"   File path: {media_index_file}")
-                print(f"   File exists: {media_index_file.exists()}")
-                print(f"   File size: {media_index_file.stat().st_size} bytes")
+                self._status(f"\n🔍 Checking existing media_index.json...")
+                self._status(f"   File path: {media_index_file}")
+                self._status(f"   File exists: {media_index_file.exists()}")
+                self._status(f"   File size: {media_index_file.stat().st_size} bytes")
                 
-                with open(media_index_file, 'r', encoding='utf-8') as f:
-                    existing_media_data = json.load(f)
+                existing_media_data = self.read_index_summary()
                 
                 # Debug: Print what we read
-                existing_pages = len(existing_media_data.get('pages', []))
+                existing_pages = existing_media_data['page_count']
                 existing_images = existing_media_data.get('downloaded_images', 0)
                 existing_total_pages = existing_media_data.get('total_pages', 0)
                 
-                print(f"   Data loaded:")
-                print(f"     - total_pages field: {existing_total_pages}")
-                print(f"     - pages array length: {existing_pages}")
-                print(f"     - downloaded_images: {existing_images}")
-                print(f"     - Expected total: {total_pages_to_process}")
+                self._status(f"   Data loaded:")
+                self._status(f"     - total_pages field: {existing_total_pages}")
+                self._status(f"     - pages array length: {existing_pages}")
+                self._status(f"     - downloaded_images: {existing_images}")
+                self._status(f"     - Expected total: {total_pages_to_process}")
                 
                 # Check if it has ALL pages processed AND has actual data
                 if existing_pages == total_pages_to_process and existing_pages > 0 and existing_images > 0:
                     has_complete_media_index = True
-                    print(f"\n✅ Media extraction already complete!")
-                    print(f"   All {existing_pages}/{total_pages_to_process} pages processed")
-                    print(f"   Images: {existing_images}")
-                    print(f"   Videos: {existing_media_data.get('total_videos', 0)}")
-                    print(f"\n⏭️  Skipping media extraction (already done)")
+                    self._status(f"\n✅ Media extraction already complete!")
+                    self._status(f"   All {existing_pages}/{total_pages_to_process} pages processed")
+                    self._status(f"   Images: {existing_images}")
+                    self._status(f"   Videos: {existing_media_data.get('total_videos', 0)}")
+                    self._status(f"\n⏭️  Skipping media extraction (already done)")
                     return existing_media_data
                 elif existing_pages > 0:
-                    print(f"\n⚠️  Existing media_index.json has {existing_pages}/{total_pages_to_process} pages")
-                    print(f"   Will use checkpoint to continue (NOT re-extract from scratch)")
-                    print(f"   Existing data preserved - will only add missing pages")
+                    self._status(f"\n⚠️  Existing media_index.json has {existing_pages}/{total_pages_to_process} pages")
+                    self._status(f"   Will use checkpoint to continue (NOT re-extract from scratch)")
+                    self._status(f"   Existing data preserved - will only add missing pages")
                 else:
-                    print(f"\n⚠️  media_index.json found but appears empty:")
-                    print(f"   Pages in file: {existing_pages}")
-                    print(f"   Images in file: {existing_images}")
-                    print(f"   Will start fresh extraction")
-            except json.JSONDecodeError as e:
+                    self._status(f"\n⚠️  media_index.json found but appears empty:")
+                    self._status(f"   Pages in file: {existing_pages}")
+                    self._status(f"   Images in file: {existing_images}")
+                    self._status(f"   Will start fresh extraction")
+            except json_io.JSONDecodeError as e:
                 logger.warning(f"Could not parse media_index.json: {e}")
-                print(f"\n⚠️  media_index.json is corrupted (JSON parse error)")
-                print(f"   Error: {e}")
+                self._status(f"\n⚠️  media_index.json is corrupted (JSON parse error)")
+                self._status(f"   Error: {e}")
                 existing_media_data = None
             except Exception as e:
                 logger.warning(f"Could not read existing media_index.json: {e}")
-                print(f"\n⚠️  Error reading media_index.json: {e}")
+                self._status(f"\n⚠️  Error reading media_index.json: {e}")
                 existing_media_data = None
         
-        # Checkpoint file
-        checkpoint_file = self.data_dir / "media_extraction_checkpoint.json"
+        # Resume from the index log - every page recorded there is done
+        checkpoint_file = self.checkpoint_file
+        media_index, processed_files, counts = self.load_index_log()
+        total_images = counts['total_images']
+        total_videos = counts['total_videos']
+        downloaded_images = counts['downloaded_images']
+        skipped_images = counts['skipped_images']
         
-        # Load checkpoint if exists
-        processed_files = set()
-        media_index = []
-        total_images = 0
-        total_videos = 0
-        downloaded_images = 0
-        skipped_images = 0
-        
-        if checkpoint_file.exists():
-            try:
-                with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                    checkpoint = json.load(f)
-                media_index = checkpoint.get('media_index', [])
-                processed_files = set(checkpoint.get('processed_files', []))
-                total_images = checkpoint.get('total_images', 0)
-                total_videos = checkpoint.get('total_videos', 0)
-                downloaded_images = checkpoint.get('downloaded_images', 0)
-                skipped_images = checkpoint.get('skipped_images', 0)
-                
-                logger.info(f"✅ Resumed from checkpoint:")
-                logger.info(f"   Processed: {len(processed_files)} files")
-                logger.info(f"   Images: {downloaded_images}")
-                logger.info(f"   Videos: {total_videos}")
-            except Exception as e:
-                logger.warning(f"Could not load checkpoint: {e}")
+        if processed_files:
+            log_info = status_logger.info if self.quiet else logger.info
+            log_info(f"✅ Resumed from checkpoint:")
+            log_info(f"   Processed: {len(processed_files)} files")
+            log_info(f"   Images: {downloaded_images}")
+            log_info(f"   Videos: {total_videos}")
         
         # Get remaining files (json_files already computed above)
         remaining_files = [f for f in json_files if f.name not in processed_files]
         
+        # One directory scan up front instead of a stat() per image
+        existing_images = {entry.name for entry in os.scandir(self.images_dir)}
+        # Same string str(img_path.relative_to(self.data_dir)) gives, without a Path per image
+        local_prefix = str(self.images_dir.relative_to(self.data_dir)) + os.sep
+        
         if len(processed_files) > 0:
-            print(f"\n✅ RESUMING from checkpoint:")
-            print(f"   Total pages: {len(json_files)}")
-            print(f"   ✓ Already processed & SKIPPED: {len(processed_files)}")
-            print(f"   → Will process remaining: {len(remaining_files)}")
-            print(f"   Images downloaded so far: {downloaded_images}")
-            print(f"   Videos found so far: {total_videos}")
+            self._status(f"\n✅ RESUMING from checkpoint:")
+            self._status(f"   Total pages: {len(json_files)}")
+            self._status(f"   ✓ Already processed & SKIPPED: {len(processed_files)}")
+            self._status(f"   → Will process remaining: {len(remaining_files)}")
+            self._status(f"   Images downloaded so far: {downloaded_images}")
+            self._status(f"   Videos found so far: {total_videos}")
         else:
-            print(f"\nStarting fresh extraction:")
-            print(f"   Total pages: {len(json_files)}")
+            self._status(f"\nStarting fresh extraction:")
+            self._status(f"   Total pages: {len(json_files)}")
         
-        print(f"\n⏩ Skipping first {len(processed_files)} files...")
-        print("📥 Processing remaining files...\n")
+        self._status(f"\n⏩ Skipping first {len(processed_files)} files...")
+        self._status("📥 Processing remaining files...\n")
         
         pages_since_checkpoint = 0
         checkpoint_interval = 50
         
         # Progress bar shows total progress including already-processed
-        with tqdm(total=len(json_files), desc="Extracting media",
-                 initial=len(processed_files),
-                 bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]',
-                 unit='page') as pbar:
+        # The index log is line-buffered so each finished page reaches disk as one line.
+        # Worker processes parse pages ahead of the main thread, which only schedules
+        # downloads (the session stays in this process) and writes the index
+        with open(self.index_log, 'a', encoding='utf-8', buffering=1) as index_log, \
+             ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=self.parse_context) as parse_pool, \
+             ThreadPoolExecutor(max_workers=self.download_workers) as download_pool, \
+             tqdm(total=len(json_files), desc="Extracting media",
+                  initial=len(processed_files),
+                  bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]',
+                  unit='page', mininterval=0.5, miniters=16,  # Redraw at most twice a second
+                  file=sys.stderr, leave=True, disable=self.quiet) as pbar:
             
-            for json_file in remaining_files:
-                # Rate limit to avoid overwhelming server
-                time.sleep(self.rate_limit_delay)
-                
+            parsed_pages = parse_pool.map(_parse_page_or_error, remaining_files,
+                                          chunksize=self.parse_chunksize)
+            for json_file, (parsed, parse_error) in zip(remaining_files, parsed_pages):
+                if self.cancel_event.is_set():
+                    # Drop the pages still queued for parsing so leaving the pools doesn't wait on them
+                    parse_pool.shutdown(wait=False, cancel_futures=True)
+                    break
                 try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        page_data = json.load(f)
-                    
-                    title = page_data.get('title', '')
-                    page_url = page_data.get('url', '')
-                    html_content = page_data.get('html_content', '')
-                    safe_filename = json_file.stem
-                    
-                    # Extract media from HTML
-                    images, videos = self.extract_media_from_html(html_content, page_url)
+                    if parse_error is not None:
+                        raise parse_error
+                    title, page_url, safe_filename, images, videos = parsed
                     total_images += len(images)
                     total_videos += len(videos)
                     
-                    # Download images
+                    # Download images - in parallel, paced by the shared rate limiter
+                    images_dir = self.images_dir
+                    download = self.download_image
                     page_images = []
+                    downloads = {}  # future -> image filename
+                    page_downloaded = 0
+                    page_skipped = 0
                     for idx, img_data in enumerate(images):
                         img_url = img_data['url']
                         
-                        # Create unique filename
-                        img_hash = hashlib.md5(img_url.encode()).hexdigest()[:12]
-                        img_ext = Path(urlparse(img_url).path).suffix or '.jpg'
+                        # Create unique filename - md5 is only a naming nonce, but changing the
+                        # hash would rename every image already on disk and defeat resume
+                        img_hash = hashlib.md5(img_url.encode(), usedforsecurity=False).hexdigest()[:12]
+                        img_ext = _url_suffix(img_url) or '.jpg'
                         img_filename = f"{safe_filename}_{idx}_{img_hash}{img_ext}"
-                        img_path = self.images_dir / img_filename
                         
                         # Download if not exists
-                        if not img_path.exists():
-                            if self.download_image(img_url, img_path):
-                                downloaded_images += 1
-                            else:
-                                skipped_images += 1
+                        if img_filename not in existing_images:
+                            downloads[download_pool.submit(download, img_url, images_dir / img_filename)] = img_filename
                         else:
-                            downloaded_images += 1
+                            page_downloaded += 1
                         
                         # Add to page images list
                         page_images.append({
                             **img_data,
-                            'local_path': str(img_path.relative_to(self.data_dir)),
+                            'local_path': local_prefix + img_filename,
                             'filename': img_filename
                         })
                     
-                    # Add to index
-                    media_index.append({
+                    # Wait for this page's downloads so its log line has final counts
+                    for future in as_completed(downloads):
+                        if future.result():
+                            page_downloaded += 1
+                            existing_images.add(downloads[future])
+                        else:
+                            page_skipped += 1
+                    
+                    # Add to index - the log line is what marks the page processed
+                    page_entry = {
                         'page_title': title,
                         'page_url': page_url,
                         'safe_filename': safe_filename,
                         'images': page_images,
                         'videos': videos
-                    })
+                    }
+                    self._append_index_log(index_log, json_file.name, page_entry, page_downloaded, page_skipped)
+                    media_index.append(page_entry)
+                    downloaded_images += page_downloaded
+                    skipped_images += page_skipped
                     
                     # Mark as processed
                     processed_files.add(json_file.name)
@@ -303,11 +478,12 @@ class MediaExtractor:
                     
                     # Update progress bar
                     pbar.update(1)
-                    pbar.set_postfix({'images': downloaded_images, 'videos': total_videos})
+                    if pbar.n % 16 == 0:
+                        pbar.set_postfix({'images': downloaded_images, 'videos': total_videos}, refresh=False)
                     
                     # Save checkpoint periodically
                     if pages_since_checkpoint >= checkpoint_interval:
-                        self._save_checkpoint(checkpoint_file, media_index, processed_files,
+                        self._save_checkpoint(checkpoint_file, processed_files,
                                             total_images, total_videos, downloaded_images, skipped_images)
                         pages_since_checkpoint = 0
                     
@@ -316,9 +492,14 @@ class MediaExtractor:
                     pbar.update(1)
         
         # Final checkpoint save
-        self._save_checkpoint(checkpoint_file, media_index, processed_files,
+        self._save_checkpoint(checkpoint_file, processed_files,
                             total_images, total_videos, downloaded_images, skipped_images)
         
+        if self.cancel_event.is_set():
+            # The index log has every finished page - the next run picks up from there
+            self._status(f"\n⏹️  Media extraction stopped after {len(processed_files)}/{len(json_files)} pages")
+            return None
+        
         # Save media index - CRITICAL: Never overwrite complete data
         if len(media_index) > 0:
             index_data = {
@@ -332,33 +513,32 @@ class MediaExtractor:
             }
             
             # CRITICAL safety check: Never overwrite complete media_index.json
-            media_index_path = self.media_dir / "media_index.json"
+            media_index_path = self.media_index_file
             should_write = True
             
             if media_index_path.exists():
                 try:
-                    with open(media_index_path, 'r', encoding='utf-8') as f:
-                        current_data = json.load(f)
+                    current_data = self.read_index_summary()
                     
-                    current_pages = len(current_data.get('pages', []))
+                    current_pages = current_data['page_count']
                     current_images = current_data.get('downloaded_images', 0)
                     new_pages = len(media_index)
                     new_images = downloaded_images
                     
                     # Don't overwrite if existing file has more OR EQUAL complete data
                     if current_pages >= new_pages and current_images > 0:
-                        print(f"\n⚠️  SAFETY: Existing media_index.json has complete data")
-                        print(f"   Existing: {current_pages} pages, {current_images} images")
-                        print(f"   New data: {new_pages} pages, {new_images} images")
-                        print(f"   NOT overwriting to prevent data loss!")
+                        self._status(f"\n⚠️  SAFETY: Existing media_index.json has complete data")
+                        self._status(f"   Existing: {current_pages} pages, {current_images} images")
+                        self._status(f"   New data: {new_pages} pages, {new_images} images")
+                        self._status(f"   NOT overwriting to prevent data loss!")
                         should_write = False
                         # Return existing data
                         return current_data
                     elif current_pages > new_pages:
-                        print(f"\n⚠️  WARNING: Existing media_index.json has MORE data")
-                        print(f"   Existing: {current_pages} pages")
-                        print(f"   New data: {new_pages} pages")
-                        print(f"   NOT overwriting to prevent data loss!")
+                        self._status(f"\n⚠️  WARNING: Existing media_index.json has MORE data")
+                        self._status(f"   Existing: {current_pages} pages")
+                        self._status(f"   New data: {new_pages} pages")
+                        self._status(f"   NOT overwriting to prevent data loss!")
                         should_write = False
                         # Return existing data
                         return current_data
@@ -368,61 +548,174 @@ class MediaExtractor:
                     pass
             
             if should_write:
-                with open(media_index_path, 'w', encoding='utf-8') as f:
-                    json.dump(index_data, f, indent=2, ensure_ascii=False)
-                print(f"\n✅ Saved media_index.json with {len(media_index)} pages")
+                # Replaced atomically - an interrupted write leaves the previous index intact
+                json_io.dump(index_data, media_index_path)
+                self._write_index_summary(index_data)
+                self._status(f"\n✅ Saved media_index.json with {len(media_index)} pages")
         else:
-            print("\n⚠️  No pages were processed - media_index.json not modified")
+            self._status("\n⚠️  No pages were processed - media_index.json not modified")
             # Try to return existing data if available
-            media_index_path = self.media_dir / "media_index.json"
+            media_index_path = self.media_index_file
             if media_index_path.exists():
                 try:
-                    with open(media_index_path, 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
-                    print("   Existing media_index.json preserved")
+                    existing_data = self.read_index_summary()
+                    self._status("   Existing media_index.json preserved")
                     return existing_data
                 except:
                     pass
-            print("   Make sure scraping has completed first!")
+            self._status("   Make sure scraping has completed first!")
             return None
         
-        print(f"\n{'='*80}")
-        print(f"MEDIA EXTRACTION COMPLETE!")
-        print(f"{'='*80}")
-        print(f"\n📸 Images:")
-        print(f"   Found: {total_images}")
-        print(f"   Downloaded: {downloaded_images}")
-        print(f"   Skipped: {skipped_images}")
-        print(f"\n🎥 Videos:")
-        print(f"   Found: {total_videos}")
-        print(f"\n📁 Saved to: {self.media_dir}")
-        print(f"   Media index: {self.media_dir / 'media_index.json'}")
-        print(f"   Images: {self.images_dir}")
+        self._status(f"\n{'='*80}")
+        self._status(f"MEDIA EXTRACTION COMPLETE!")
+        self._status(f"{'='*80}")
+        self._status(f"\n📸 Images:")
+        self._status(f"   Found: {total_images}")
+        self._status(f"   Downloaded: {downloaded_images}")
+        self._status(f"   Skipped: {skipped_images}")
+        self._status(f"\n🎥 Videos:")
+        self._status(f"   Found: {total_videos}")
+        self._status(f"\n📁 Saved to: {self.media_dir}")
+        self._status(f"   Media index: {self.media_dir / 'media_index.json'}")
+        self._status(f"   Images: {self.images_dir}")
         
         # Keep checkpoint file to mark completion - allows skipping media linking on reruns
         # The checkpoint serves as a completion marker for run.py
         if checkpoint_file.exists():
-            print("\n📝 Checkpoint preserved (marks extraction as complete)")
+            self._status("\n📝 Checkpoint preserved (marks extraction as complete)")
         
         return index_data
     
-    def _save_checkpoint(self, checkpoint_file: Path, media_index: List, processed_files: set,
+    def read_index_summary(self) -> Dict:
+        """Counts from media_index.json (everything but the pages, plus page_count), read from
+        the meta sidecar when it still matches the index file and from the index otherwise"""
+        stat = self.media_index_file.stat()
+        if self.media_index_meta.exists():
+            try:
+                summary = json_io.load(self.media_index_meta)
+                # The scraper writes media_index.json too - only trust a sidecar written with this file
+                if summary.get('index_size') == stat.st_size and summary.get('index_mtime') == stat.st_mtime:
+                    return summary
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable {self.media_index_meta.name}: {e}")
+        
+        return self._write_index_summary(self._scan_index_counts())
+    
+    def _scan_index_counts(self) -> Dict:
+        """media_index.json's top-level fields plus page_count, streamed so the pages are never built"""
+        if ijson is None:
+            index_data = json_io.load(self.media_index_file)
+            summary = {key: value for key, value in index_data.items() if key != 'pages'}
+            summary['page_count'] = len(index_data.get('pages', []))
+            return summary
+        
+        summary = {}
+        page_count = 0
+        with open(self.media_index_file, 'rb') as f:
+            for prefix, event, value in ijson.parse(f, use_float=True):
+                if prefix == 'pages.item' and event == 'start_map':
+                    page_count += 1
+                elif prefix and '.' not in prefix and event in ('string', 'number', 'boolean', 'null'):
+                    summary[prefix] = value
+        summary['page_count'] = page_count
+        return summary
+    
+    def _write_index_summary(self, index_data: Dict) -> Dict:
+        """Record media_index.json's counts in the meta sidecar so later runs skip parsing it"""
+        summary = {key: value for key, value in index_data.items() if key != 'pages'}
+        if 'page_count' not in summary:
+            summary['page_count'] = len(index_data.get('pages', []))
+        stat = self.media_index_file.stat()
+        summary['index_size'] = stat.st_size
+        summary['index_mtime'] = stat.st_mtime
+        json_io.dump(summary, self.media_index_meta)
+        return summary
+    
+    def load_index_log(self) -> Tuple[List[Dict], set, Dict[str, int]]:
+        """Rebuild the media index, processed files and counters from the index log"""
+        media_index = []
+        processed_files = set()
+        counts = {'total_images': 0, 'total_videos': 0, 'downloaded_images': 0, 'skipped_images': 0}
+        
+        if not self.index_log.exists():
+            self._migrate_legacy_checkpoint()
+        if not self.index_log.exists():
+            return media_index, processed_files, counts
+        
+        try:
+            valid_bytes = 0
+            with open(self.index_log, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    valid_bytes += len(line)
+                    try:
+                        record = json_io.loads(line)
+                    except json_io.JSONDecodeError:
+                        continue
+                    page = record['page']
+                    media_index.append(page)
+                    processed_files.add(record['file'])
+                    counts['total_images'] += len(page['images'])
+                    counts['total_videos'] += len(page['videos'])
+                    counts['downloaded_images'] += record['downloaded']
+                    counts['skipped_images'] += record['skipped']
+            
+            if valid_bytes < self.index_log.stat().st_size:
+                # Drop a torn final line from an interrupted write so new lines aren't appended
+                # onto it - that page is simply processed again
+                with open(self.index_log, 'r+b') as f:
+                    f.truncate(valid_bytes)
+        except Exception as e:
+            logger.warning(f"Could not load checkpoint: {e}")
+            return [], set(), dict.fromkeys(counts, 0)
+        
+        return media_index, processed_files, counts
+    
+    def _migrate_legacy_checkpoint(self):
+        """Move pages from a checkpoint that embedded the whole media index into the index log"""
+        if not self.checkpoint_file.exists():
+            return
+        try:
+            checkpoint = json_io.load(self.checkpoint_file)
+            if 'media_index' not in checkpoint:
+                return
+            tmp_path = self.index_log.with_suffix('.jsonl.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as index_log:
+                for page in checkpoint['media_index']:
+                    # Per-page download results weren't kept - an image on disk counts as downloaded
+                    downloaded = sum(1 for img in page['images'] if (self.data_dir / img['local_path']).exists())
+                    self._append_index_log(index_log, f"{page['safe_filename']}.json", page,
+                                           downloaded, len(page['images']) - downloaded)
+            tmp_path.replace(self.index_log)
+            logger.info(f"Migrated {self.checkpoint_file.name} to {self.index_log.name}")
+        except Exception as e:
+            logger.warning(f"Could not migrate legacy checkpoint: {e}")
+    
+    def _append_index_log(self, index_log, filename: str, page: Dict, downloaded: int, skipped: int):
+        """Record one processed page (and how many of its images were downloaded) in the index log"""
+        index_log.write(json_io.dumps({
+            'file': filename,
+            'downloaded': downloaded,
+            'skipped': skipped,
+            'page': page
+        }) + '\n')
+    
+    def _save_checkpoint(self, checkpoint_file: Path, processed_files: set,
                         total_images: int, total_videos: int, downloaded_images: int, skipped_images: int):
-        """Save extraction checkpoint"""
+        """Save extraction checkpoint counters - the pages themselves are already in the index log"""
         checkpoint_data = {
-            'media_index': media_index,
-            'processed_files': list(processed_files),
+            'processed_pages': len(processed_files),
             'total_images': total_images,
             'total_videos': total_videos,
             'downloaded_images': downloaded_images,
             'skipped_images': skipped_images,
             'last_updated': datetime.now().isoformat()
         }
-        with open(checkpoint_file, 'w', encoding='utf-8') as f:
-            json.dump(checkpoint_data, f, indent=2, ensure_ascii=False)
+        json_io.dump(checkpoint_data, checkpoint_file, indent=False)  # Machine-read only
         
-        # Show checkpoint save notification (force flush for tqdm compatibility)
-        print(f"\n💾 Checkpoint saved: {len(processed_files)} pages, {downloaded_images} images, {total_videos} videos", flush=True)
+        # Show checkpoint save notification
+        self._status(f"\n💾 Checkpoint saved: {len(processed_files)} pages, {downloaded_images} images, {total_videos} videos")
 
 if __name__ == "__main__":
     extractor = MediaExtractor()
@@ -0,0 +1,72 @@
+"""
+JSON helpers shared by the scraper, media extractor and analyzer
+Uses orjson when it is installed (several times faster on large timelines
+and media indexes) and falls back to the stdlib json module otherwise
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - stdlib json produces the same output
+    orjson = None
+
+# orjson.JSONDecodeError subclasses this, so callers can always catch it
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize to a JSON string, keeping non-ASCII characters as-is"""
+    if orjson is not None:
+        return dumps_bytes(obj, indent=indent).decode('utf-8')
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes - orjson produces these directly"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return dumps(obj, indent=indent).encode('utf-8')
+
+
+def load(path: Union[str, Path]) -> Any:
+    """Read and parse a JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump(obj: Any, path: Union[str, Path], indent: bool = True):
+    """Write obj to path as UTF-8 JSON in a single write, with no str round-trip
+
+    The file is replaced atomically, so a crash mid-write leaves the previous
+    version intact rather than a truncated document
+    """
+    write_atomic(dumps_bytes(obj, indent=indent), path)
+
+
+def write_atomic(data: bytes, path: Union[str, Path]):
+    """Write bytes to path via a temp file and os.replace - readers see the old file or the new one"""
+    path = Path(path)
+    # Unique per process and thread so concurrent writers never share a temp file
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
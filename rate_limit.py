@@ -0,0 +1,23 @@
+"""
+Request pacing shared by the scraper and media extractor
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Spaces out request starts across threads - at most one every `interval` seconds"""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        """Block until this caller's request slot comes up"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -3,12 +3,59 @@
 Main runner script for CWCki scraping and analysis
 """
 
+import asyncio
+import logging
 import sys
+import threading
 import time
-import json
 from pathlib import Path
 from datetime import datetime
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import json_io
+
+logger = logging.getLogger(__name__)
+# Step 2's status lines while it runs in the background - extract_media writes these to
+# media_extraction.log only, keeping them off the console Step 3 is using
+media_status_logger = logging.getLogger('extract_media.status')
+
+# State files smaller than this hold no pages or events - judged by stat() alone, never parsed
+MIN_STATE_FILE_SIZE = 128
+
+LOG_FORMAT = '[%(asctime)s] %(levelname)s: %(message)s'
+
+def setup_logging():
+    """Configure logging for the whole run, before any step module is imported
+    
+    The step modules each call basicConfig on import, but only the first call in a process
+    takes effect - so under run.py their setup is a no-op and is done here instead. Each
+    module logs to its own file and to the console at the level it uses standalone.
+    """
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)  # run.py and third-party loggers
+    formatter = logging.Formatter(LOG_FORMAT)
+    
+    for name, log_file, console_level in (
+            ('scraper', 'scraper.log', logging.INFO),
+            ('extract_media', 'media_extraction.log', logging.INFO),
+            ('analyzer', 'analyzer.log', logging.ERROR)):  # The analyzer only shows errors
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(formatter)
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(console_level)
+        console_handler.setFormatter(formatter)
+        
+        module_logger = logging.getLogger(name)
+        module_logger.setLevel(logging.INFO)
+        module_logger.addHandler(file_handler)
+        module_logger.addHandler(console_handler)
+        module_logger.propagate = False
+        
+        if name == 'extract_media':
+            # Background Step 2's status lines - same file, never the console
+            media_status_logger.setLevel(logging.INFO)
+            media_status_logger.addHandler(file_handler)
+            media_status_logger.propagate = False
 
 def print_header(text):
     """Print a formatted header"""
@@ -16,217 +63,254 @@ def print_header(text):
     print(f" {text}")
     print("="*80 + "\n")
 
+def exit_missing_requirements(error):
+    """Explain a failed module import and stop"""
+    print(f"\n❌ Error importing modules: {error}")
+    print("\nMake sure you've installed all requirements:")
+    print("  pip install -r requirements.txt")
+    sys.exit(1)
+
 def print_step(step_num, total_steps, text):
     """Print a formatted step"""
     print(f"\n[Step {step_num}/{total_steps}] {text}")
     print("-"*80)
 
-def main():
-    print_header("CWCki Scraper and Analysis System")
-    print("This system will:")
-    print("  1. Scrape all pages from the CWCki (https://sonichu.com/cwcki)")
-    print("  2. Process and clean the content")
-    print("  3. Use AI to analyze and extract timeline events")
-    print("  4. Generate a comprehensive biographical summary")
-    print("\nEstimated time: 5-8 hours total")
-    print("Estimated cost: $20-50 in AWS Bedrock usage")
-    
-    # Check if running in non-interactive mode (e.g., background process)
-    non_interactive = not sys.stdin.isatty() or os.getenv('CWCKI_AUTO_RUN') == '1'
-    
-    if not non_interactive:
-        # Only prompt if interactive
-        response = input("\nDo you want to proceed? (yes/no): ").strip().lower()
-        if response not in ['yes', 'y']:
-            print("Aborted.")
-            return
-    else:
-        print("\n✅ Running in non-interactive mode - proceeding automatically...")
-    
-    start_time = time.time()
-    
-    # Import modules
-    try:
-        from scraper import CWCkiScraper
-        from analyzer import CWCkiAnalyzer
-        from extract_media import MediaExtractor
-    except ImportError as e:
-        print(f"\n❌ Error importing modules: {e}")
-        print("\nMake sure you've installed all requirements:")
-        print("  pip install -r requirements.txt")
-        sys.exit(1)
+def _load_media_state(media_extractor, say=print) -> dict:
+    """Read media_index.json's counts and the extraction checkpoint at most once each"""
+    raw_json_dir = media_extractor.raw_json_dir
+    total_pages_expected = 0
+    if raw_json_dir.exists():
+        # One directory pass, no Path object or fnmatch per entry
+        with os.scandir(raw_json_dir) as entries:
+            total_pages_expected = sum(1 for e in entries
+                                       if e.name.endswith('.json') and e.is_file(follow_symlinks=False))
+    state = {
+        'total_pages_expected': total_pages_expected,
+        'index_summary': None,
+        'existing_pages': 0,
+        'existing_images': 0,
+        'checkpoint_data': None,
+        'checkpoint_pages': 0,
+    }
     
-    # Step 1: Scrape the wiki
-    print_step(1, 2, "Scraping CWCki")
-    print("This will take approximately 4-6 hours...")
-    print("The scraper will fetch all pages.")
+    index_file = media_extractor.media_index_file
+    if index_file.exists() and index_file.stat().st_size < MIN_STATE_FILE_SIZE:
+        state['index_summary'] = {}  # Empty or truncated - counts stay at zero
+    elif index_file.exists():
+        try:
+            # Counts come from the small meta sidecar - the pages list is never materialized
+            summary = media_extractor.read_index_summary()
+            state['index_summary'] = summary
+            state['existing_pages'] = summary['page_count']
+            state['existing_images'] = summary.get('downloaded_images', 0)
+        except Exception as e:
+            say(f"\n⚠️  Error reading media_index.json: {e}")
     
-    try:
-        scraper = CWCkiScraper()
-        scrape_summary = scraper.scrape_all_pages()
-        
-        print(f"\n✅ Scraping completed!")
-        print(f"   Total pages: {scrape_summary['total_pages']}")
-        print(f"   Successful: {scrape_summary['successful']}")
-        print(f"   Failed: {scrape_summary['failed']}")
-        
-        if scrape_summary['failed'] > 0:
-            print(f"\n⚠️  Warning: {scrape_summary['failed']} pages failed to scrape")
-            print("   See scraped_data/scrape_summary.json for details")
-        
-    except Exception as e:
-        print(f"\n❌ Error during scraping: {e}")
-        print("\nTroubleshooting:")
-        print("  - Check your internet connection")
-        print("  - Verify the CWCki website is accessible")
-        print("  - Check scraped_data/ directory for partial results")
-        sys.exit(1)
+    if media_extractor.checkpoint_file.exists():
+        try:
+            checkpoint_data = json_io.load(media_extractor.checkpoint_file)
+            state['checkpoint_data'] = checkpoint_data
+            # The checkpoint only holds counters - the pages are in the extractor's index log
+            state['checkpoint_pages'] = checkpoint_data.get('processed_pages', 0)
+        except Exception as e:
+            say(f"\n⚠️  Error reading checkpoint: {e}")
     
-    # Step 2: Extract media from scraped pages
-    print_step(2, 3, "Extracting Media from Pages")
-    print("This will process scraped HTML to:")
-    print("  - Download all images from pages")
-    print("  - Extract video URLs")
-    print("  - Create media index")
+    return state
+
+def extract_media_step(media_extractor_cls, quiet: bool = False, cancel_event=None):
+    """Step 2 - extract media from the scraped pages, resuming from any checkpoint
     
+    quiet sends status lines to media_extraction.log and hides progress bars instead,
+    for running alongside Step 3. Setting cancel_event stops extraction after the current page.
+    """
+    say = (lambda message: media_status_logger.info(message.strip())) if quiet else print
     try:
-        media_extractor = MediaExtractor()
+        media_extractor = media_extractor_cls()
+        media_extractor.quiet = quiet
+        if cancel_event is not None:
+            media_extractor.cancel_event = cancel_event
         
         # Check if media already extracted (check both final file and checkpoint)
-        media_index_path = Path('scraped_data/media/media_index.json')
-        checkpoint_path = Path('scraped_data/media_extraction_checkpoint.json')
-        raw_json_dir = Path('scraped_data/raw_json')
+        media_index_path = media_extractor.media_index_file
         media_already_extracted = False
         
-        # Count total pages that should be processed
-        total_pages_expected = len(list(raw_json_dir.glob('*.json'))) if raw_json_dir.exists() else 0
+        # Each state file is read once here and reused by every check below
+        media_state = _load_media_state(media_extractor, say)
+        total_pages_expected = media_state['total_pages_expected']
+        index_summary = media_state['index_summary']
+        checkpoint_data = media_state['checkpoint_data']
         
         # First check if media_index.json already has complete data
-        if media_index_path.exists():
-            try:
-                with open(media_index_path, 'r') as f:
-                    existing_data = json.load(f)
-                existing_pages = len(existing_data.get('pages', []))
-                existing_images = existing_data.get('downloaded_images', 0)
-                
-                if existing_pages == total_pages_expected and existing_pages > 0 and existing_images > 0:
-                    media_already_extracted = True
-                    print(f"\n✅ Media already extracted:")
-                    print(f"   All {existing_pages}/{total_pages_expected} pages processed")
-                    print(f"   Images: {existing_images}")
-                    print(f"   Videos: {existing_data.get('total_videos', 0)}")
-                    print(f"\n⏭️  Skipping media extraction (complete data found)")
-            except Exception as e:
-                print(f"\n⚠️  Error reading media_index.json: {e}")
+        if index_summary is not None:
+            existing_pages = media_state['existing_pages']
+            existing_images = media_state['existing_images']
+            
+            if existing_pages == total_pages_expected and existing_pages > 0 and existing_images > 0:
+                media_already_extracted = True
+                say(f"\n✅ Media already extracted:")
+                say(f"   All {existing_pages}/{total_pages_expected} pages processed")
+                say(f"   Images: {existing_images}")
+                say(f"   Videos: {index_summary.get('total_videos', 0)}")
+                say(f"\n⏭️  Skipping media extraction (complete data found)")
         
         # Check checkpoint file only if media_index.json doesn't have complete data
-        if not media_already_extracted and checkpoint_path.exists() and total_pages_expected > 0:
+        if not media_already_extracted and checkpoint_data is not None and total_pages_expected > 0:
             try:
-                with open(checkpoint_path, 'r') as f:
-                    checkpoint_data = json.load(f)
-                media_entries = checkpoint_data.get('media_index', [])
-                checkpoint_pages = len(media_entries)
+                checkpoint_pages = media_state['checkpoint_pages']
                 
                 # Only consider complete if checkpoint has ALL pages
                 if checkpoint_pages == total_pages_expected:
-                    # Count images and videos
-                    total_images = sum(len(page.get('images', [])) for page in media_entries)
-                    total_videos = sum(len(page.get('videos', [])) for page in media_entries)
+                    total_images = checkpoint_data.get('total_images', 0)
+                    total_videos = checkpoint_data.get('total_videos', 0)
                     
                     media_already_extracted = True
-                    print(f"\n✅ Media extraction complete (from checkpoint):")
-                    print(f"   All {checkpoint_pages}/{total_pages_expected} pages processed")
-                    print(f"   Images: {total_images}")
-                    print(f"   Videos: {total_videos}")
+                    say(f"\n✅ Media extraction complete (from checkpoint):")
+                    say(f"   All {checkpoint_pages}/{total_pages_expected} pages processed")
+                    say(f"   Images: {total_images}")
+                    say(f"   Videos: {total_videos}")
                     
                     # CRITICAL: Only finalize if media_index.json doesn't already have better data
                     should_finalize = False
                     if not media_index_path.exists():
                         should_finalize = True
-                        print("   media_index.json doesn't exist - will create from checkpoint")
+                        say("   media_index.json doesn't exist - will create from checkpoint")
                     else:
-                        # Check if existing file needs updating
+                        # Check if existing file needs updating - counts were read above
                         try:
-                            with open(media_index_path, 'r') as f:
-                                current_data = json.load(f)
-                            current_pages = len(current_data.get('pages', []))
-                            current_images = current_data.get('downloaded_images', 0)
+                            if index_summary is None:
+                                raise ValueError("counts could not be read")
+                            current_pages = media_state['existing_pages']
+                            current_images = media_state['existing_images']
                             
                             # NEVER overwrite complete data - checkpoint might be stale/incomplete
                             if current_pages >= checkpoint_pages and current_images > 0:
-                                print(f"   ⏭️  media_index.json already has complete data:")
-                                print(f"      Current: {current_pages} pages, {current_images} images")
-                                print(f"      Checkpoint: {checkpoint_pages} pages, {total_images} images")
-                                print(f"   Keeping existing file - NOT overwriting with checkpoint!")
+                                say(f"   ⏭️  media_index.json already has complete data:")
+                                say(f"      Current: {current_pages} pages, {current_images} images")
+                                say(f"      Checkpoint: {checkpoint_pages} pages, {total_images} images")
+                                say(f"   Keeping existing file - NOT overwriting with checkpoint!")
                                 should_finalize = False
                             elif current_pages == 0 or current_images == 0:
                                 # Only overwrite if current file is actually empty
-                                print(f"   media_index.json appears empty - will use checkpoint data")
+                                say(f"   media_index.json appears empty - will use checkpoint data")
                                 should_finalize = True
                             else:
-                                print(f"   ⚠️  media_index.json has {current_pages} pages with {current_images} images")
-                                print(f"   Checkpoint has {checkpoint_pages} pages with {total_images} images")
-                                print(f"   Keeping existing file to be safe")
+                                say(f"   ⚠️  media_index.json has {current_pages} pages with {current_images} images")
+                                say(f"   Checkpoint has {checkpoint_pages} pages with {total_images} images")
+                                say(f"   Keeping existing file to be safe")
                                 should_finalize = False
                         except Exception as e:
-                            print(f"   ⚠️  Error reading media_index.json: {e}")
-                            print(f"   Will NOT overwrite to prevent data loss")
+                            say(f"   ⚠️  Error reading media_index.json: {e}")
+                            say(f"   Will NOT overwrite to prevent data loss")
                             should_finalize = False
                     
                     if should_finalize:
-                        print("   Finalizing media_index.json from checkpoint...")
+                        say("   Finalizing media_index.json from checkpoint...")
+                        # Replaying the log also yields its running counters - no per-page summing
+                        media_entries, _, counts = media_extractor.load_index_log()
                         final_data = {
                             'total_pages': len(media_entries),
-                            'total_images': total_images,
-                            'downloaded_images': total_images,
-                            'skipped_images': 0,
-                            'total_videos': total_videos,
+                            'total_images': counts['total_images'],
+                            'downloaded_images': counts['downloaded_images'],
+                            'skipped_images': counts['skipped_images'],
+                            'total_videos': counts['total_videos'],
                             'extracted_at': checkpoint_data.get('last_updated', ''),
                             'pages': media_entries
                         }
-                        with open(media_index_path, 'w') as f:
-                            json.dump(final_data, f, indent=2)
-                        print(f"   ✅ media_index.json created with {len(media_entries)} pages!")
+                        json_io.dump(final_data, media_index_path)  # Atomic - never leaves a truncated index
+                        say(f"   ✅ media_index.json created with {len(media_entries)} pages!")
                 else:
-                    print(f"\n⚠️  Incomplete checkpoint found:")
-                    print(f"   Has {checkpoint_pages}/{total_pages_expected} pages")
-                    print(f"   Will continue extraction from checkpoint...")
+                    say(f"\n⚠️  Incomplete checkpoint found:")
+                    say(f"   Has {checkpoint_pages}/{total_pages_expected} pages")
+                    say(f"   Will continue extraction from checkpoint...")
             except Exception as e:
-                print(f"\n⚠️  Error reading checkpoint: {e}")
+                say(f"\n⚠️  Error reading checkpoint: {e}")
         
         
         if not media_already_extracted:
-            print("\nExtracting media from scraped pages...")
+            say("\nExtracting media from scraped pages...")
             media_data = media_extractor.extract_all_media()
             
             if media_data is None:
-                print(f"\n⚠️  Media extraction skipped or failed")
+                say(f"\n⚠️  Media extraction skipped or failed")
             elif media_data.get('total_pages', 0) == 0:
-                print(f"\n⚠️  Media extraction completed but found no pages")
-                print("   This might indicate an issue with the raw_json directory")
+                say(f"\n⚠️  Media extraction completed but found no pages")
+                say("   This might indicate an issue with the raw_json directory")
             else:
-                print(f"\n✅ Media extraction completed!")
-                print(f"   Pages processed: {media_data.get('total_pages', 0)}")
-                print(f"   Images downloaded: {media_data.get('downloaded_images', 0)}")
-                print(f"   Videos found: {media_data.get('total_videos', 0)}")
+                say(f"\n✅ Media extraction completed!")
+                say(f"   Pages processed: {media_data.get('total_pages', 0)}")
+                say(f"   Images downloaded: {media_data.get('downloaded_images', 0)}")
+                say(f"   Videos found: {media_data.get('total_videos', 0)}")
         
     except Exception as e:
-        print(f"\n⚠️  Warning: Media extraction failed: {e}")
-        print("   Continuing without media...")
+        say(f"\n⚠️  Warning: Media extraction failed: {e}")
+        say("   Continuing without media...")
+
+
+def main():
+    setup_logging()
+    print_header("CWCki Scraper and Analysis System")
+    print("This system will:")
+    print("  1. Scrape all pages from the CWCki (https://sonichu.com/cwcki)")
+    print("  2. Process and clean the content")
+    print("  3. Use AI to analyze and extract timeline events")
+    print("  4. Generate a comprehensive biographical summary")
+    print("\nEstimated time: 5-8 hours total")
+    print("Estimated cost: $20-50 in AWS Bedrock usage")
+    
+    # Check if running in non-interactive mode (e.g., background process)
+    non_interactive = not sys.stdin.isatty() or os.getenv('CWCKI_AUTO_RUN') == '1'
+    
+    if not non_interactive:
+        # Only prompt if interactive
+        response = input("\nDo you want to proceed? (yes/no): ").strip().lower()
+        if response not in ['yes', 'y']:
+            print("Aborted.")
+            return
+    else:
+        print("\n✅ Running in non-interactive mode - proceeding automatically...")
     
-    # Step 3: Analyze content and generate outputs
-    print_step(3, 3, "Analyzing Content with AI")
-    print("This will use Strands Agents (Amazon Bedrock with Claude) to:")
-    print("  - Extract chronological events")
-    print("  - Generate comprehensive timeline")
-    print("  - Link media to events")
-    print("  - Create biographical summary")
+    start_time = time.time()
+    
+    # Step 1: Scrape the wiki
+    print_step(1, 2, "Scraping CWCki")
+    print("This will take approximately 4-6 hours...")
+    print("The scraper will fetch all pages.")
     
-    # Check for AWS credentials
+    # Each step imports its module just before it runs - the analyzer's Strands/boto3
+    # stack is not loaded at all until Step 3
+    try:
+        from scraper import CWCkiScraper
+    except ImportError as e:
+        exit_missing_requirements(e)
+    
+    try:
+        scraper = CWCkiScraper()
+        # Pages fetched at once - CWCKI_SCRAPE_CONCURRENCY caps it (1 = the old serial crawl)
+        concurrency = int(os.getenv('CWCKI_SCRAPE_CONCURRENCY', '8'))
+        scrape_summary = scraper.scrape_all_pages(concurrency=concurrency)
+        
+        print(f"\n✅ Scraping completed!")
+        print(f"   Total pages: {scrape_summary['total_pages']}")
+        print(f"   Successful: {scrape_summary['successful']}")
+        print(f"   Failed: {scrape_summary['failed']}")
+        
+        if scrape_summary['failed'] > 0:
+            print(f"\n⚠️  Warning: {scrape_summary['failed']} pages failed to scrape")
+            print("   See scraped_data/scrape_summary.json for details")
+        
+    except Exception as e:
+        print(f"\n❌ Error during scraping: {e}")
+        print("\nTroubleshooting:")
+        print("  - Check your internet connection")
+        print("  - Verify the CWCki website is accessible")
+        print("  - Check scraped_data/ directory for partial results")
+        sys.exit(1)
+    
+    # Check for AWS credentials before Step 2 starts, since Step 3 overlaps it
     if not any([
         os.getenv('AWS_ACCESS_KEY_ID'),
         os.getenv('AWS_PROFILE'),
-        Path.home() / '.aws' / 'credentials'
+        os.path.exists(os.path.expanduser('~/.aws/credentials'))
     ]):
         print("\n⚠️  Warning: AWS credentials not detected!")
         print("   Make sure you have configured AWS credentials.")
@@ -240,68 +324,110 @@ def main():
         else:
             print("\n⚠️  Continuing without detected credentials - relying on environment...")
     
+    # Step 2: Extract media from scraped pages
+    print_step(2, 3, "Extracting Media from Pages")
+    print("This will process scraped HTML to:")
+    print("  - Download all images from pages")
+    print("  - Extract video URLs")
+    print("  - Create media index")
+    
+    # Media extraction only needs the scraped pages and the timeline only needs the clean text,
+    # so Step 2 runs in the background while Step 3 builds the timeline - linking waits for it
+    try:
+        from extract_media import MediaExtractor
+    except ImportError as e:
+        exit_missing_requirements(e)
+    media_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="media")
+    # Step 3 owns the console until the two join - Step 2 only logs, with no progress bar
+    media_cancel = threading.Event()
+    media_step = media_pool.submit(extract_media_step, MediaExtractor, quiet=True, cancel_event=media_cancel)
+    media_pool.shutdown(wait=False)
+    
     try:
-        analyzer = CWCkiAnalyzer()
+        # Step 3: Analyze content and generate outputs
+        print_step(3, 3, "Analyzing Content with AI")
+        print("This will use Strands Agents (Amazon Bedrock with Claude) to:")
+        print("  - Extract chronological events")
+        print("  - Generate comprehensive timeline")
+        print("  - Link media to events")
+        print("  - Create biographical summary")
+    
+        try:
+            from analyzer import CWCkiAnalyzer
+        except ImportError as e:
+            exit_missing_requirements(e)
+    
+        try:
+            analyzer = CWCkiAnalyzer()
         
-        # Generate timeline
-        print("\nGenerating timeline...")
-        timeline = analyzer.generate_timeline()
+            # Generate timeline
+            print("\nGenerating timeline...")
+            timeline = analyzer.generate_timeline()
         
-        # Link media to events - skip if already done (checkpoint exists means complete)
-        media_index_path = Path('scraped_data/media/media_index.json')
-        media_linking_checkpoint = Path('scraped_data/media_linking_checkpoint.json')
-        timeline_media_path = Path('scraped_data/timeline_with_media.json')
+            # Media linking joins the timeline against Step 2's index, so Step 2 must be done
+            if not media_step.done():
+                print("\nWaiting for media extraction to finish...")
+            media_step.result()
         
-        # Check if media linking already complete
-        media_linking_complete = False
-        if timeline_media_path.exists() and media_linking_checkpoint.exists():
-            try:
-                # Both timeline_with_media.json and checkpoint exist = complete
-                with open(media_linking_checkpoint, 'r') as f:
-                    checkpoint_data = json.load(f)
-                checkpoint_events = len(checkpoint_data.get('events_with_media', []))
-                
-                if checkpoint_events > 0:
-                    print(f"\n✅ Media linking already complete")
-                    print(f"   Checkpoint exists with {checkpoint_events} events")
-                    print(f"   timeline_with_media.json exists")
-                    print(f"\n⏭️  Skipping media linking (already done)")
-                    media_linking_complete = True
-            except Exception as e:
-                logger.debug(f"Could not verify media linking completion: {e}")
+            # Link media to events - skip if already done (checkpoint exists means complete)
+            media_index_path = Path('scraped_data/media/media_index.json')
+            media_linking_checkpoint = Path('scraped_data/media_linking_checkpoint.json')
+            timeline_media_path = Path('scraped_data/timeline_with_media.json')
         
-        if not media_linking_complete and media_index_path.exists():
-            try:
-                with open(media_index_path, 'r') as f:
-                    media_data = json.load(f)
-                if media_data.get('total_pages', 0) > 0:
-                    print("\nLinking media to timeline events...")
-                    timeline_with_media = analyzer.link_media_to_events()
-                else:
-                    print("\n⚠️  Media index is empty, skipping media linking")
-            except Exception as e:
-                print(f"\n⚠️  Error checking media index: {e}")
-        elif not media_linking_complete:
-            print("\n⚠️  Media index not found, skipping media linking")
+            # Check if media linking already complete
+            media_linking_complete = False
+            if (timeline_media_path.exists() and media_linking_checkpoint.exists()
+                    and media_linking_checkpoint.stat().st_size >= MIN_STATE_FILE_SIZE):
+                try:
+                    # Both timeline_with_media.json and checkpoint exist = complete
+                    checkpoint_data = json_io.load(media_linking_checkpoint)
+                    checkpoint_events = len(checkpoint_data.get('events_with_media', []))
+                
+                    if checkpoint_events > 0:
+                        print(f"\n✅ Media linking already complete")
+                        print(f"   Checkpoint exists with {checkpoint_events} events")
+                        print(f"   timeline_with_media.json exists")
+                        print(f"\n⏭️  Skipping media linking (already done)")
+                        media_linking_complete = True
+                except Exception as e:
+                    logger.debug(f"Could not verify media linking completion: {e}")
         
-        # Generate summary
-        print("\nGenerating comprehensive summary...")
-        summary = analyzer.generate_summary()
+            if not media_linking_complete and media_index_path.exists():
+                try:
+                    media_data = {}
+                    if media_index_path.stat().st_size >= MIN_STATE_FILE_SIZE:
+                        media_data = json_io.load(media_index_path)
+                    if media_data.get('total_pages', 0) > 0:
+                        print("\nLinking media to timeline events...")
+                        # Hand over the index parsed here so it is not read from disk a second time
+                        timeline_with_media = analyzer.link_media_to_events(media_data=media_data)
+                    else:
+                        print("\n⚠️  Media index is empty, skipping media linking")
+                except Exception as e:
+                    print(f"\n⚠️  Error checking media index: {e}")
+            elif not media_linking_complete:
+                print("\n⚠️  Media index not found, skipping media linking")
         
-        # Generate worst things committed list
-        print("\nGenerating top 100 worst things committed list...")
-        worst_things = analyzer.generate_worst_things_list()
+            # Generate summary and worst things committed list - independent AI calls, run side by side
+            print("\nGenerating comprehensive summary and top 100 worst things committed list...")
+            summary, worst_things = asyncio.run(analyzer.generate_reports_async())
         
-        print(f"\n✅ Analysis completed!")
+            print(f"\n✅ Analysis completed!")
         
-    except Exception as e:
-        print(f"\n❌ Error during analysis: {e}")
-        print("\nTroubleshooting:")
-        print("  - Verify AWS credentials are properly configured")
-        print("  - Ensure Claude 4 Sonnet access is enabled in Amazon Bedrock")
-        print("  - Check your AWS region supports Bedrock")
-        print("  - See README.md for detailed setup instructions")
-        sys.exit(1)
+        except Exception as e:
+            print(f"\n❌ Error during analysis: {e}")
+            print("\nTroubleshooting:")
+            print("  - Verify AWS credentials are properly configured")
+            print("  - Ensure Claude 4 Sonnet access is enabled in Amazon Bedrock")
+            print("  - Check your AWS region supports Bedrock")
+            print("  - See README.md for detailed setup instructions")
+            sys.exit(1)
+    finally:
+        # Leaving early (analysis failed, missing requirements, Ctrl-C) - the interpreter waits
+        # for the media thread on exit, so stop it rather than let it download for hours
+        if not media_step.done():
+            print("\n⏹️  Stopping media extraction after its current page - progress is saved and resumes on the next run")
+            media_cancel.set()
     
     # Summary
     elapsed_time = time.time() - start_time
@@ -6,18 +6,26 @@ Includes media (images and videos) extraction
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import re
 import logging
 import hashlib
+import os
 from pathlib import Path
-from typing import List, Dict, Optional, Set, Tuple
+from typing import Deque, Iterable, List, Dict, Optional, Set, Tuple
+from collections import deque
+from itertools import islice
 from datetime import datetime
-from bs4 import BeautifulSoup
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from lxml import etree, html as lxml_html
 from tqdm import tqdm
 from urllib.parse import urljoin, urlparse, unquote
 
+import json_io
+from rate_limit import RateLimiter
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +37,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Compiled once - page queries run on every fetched page
+_HAS_CLASS = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+_FIRST_HEADING = etree.XPath(f"(//h1[{_HAS_CLASS.format('firstHeading')}])[1]")
+_FIRST_H1 = etree.XPath("(//h1)[1]")
+_DIV_BY_ID = etree.XPath("(//div[@id = $div_id])[1]")
+_LINKS = etree.XPath(".//a[@href]")
+_FIGURE_ANCESTOR = etree.XPath("ancestor::figure[1]")
+_THUMBINNER_ANCESTOR = etree.XPath(f"ancestor::div[{_HAS_CLASS.format('thumbinner')}][1]")
+_FIGCAPTION = etree.XPath("(.//figcaption)[1]")
+_THUMBCAPTION = etree.XPath(f"(.//div[{_HAS_CLASS.format('thumbcaption')}])[1]")
+# Characters replaced in page titles to make file names - the analyzer mirrors this
+_SAFE_FN_RE = re.compile(r'[^\w\s-]')
+# Visible text only - script, style and template contents are not part of a title or link text
+_VISIBLE_TEXT = etree.XPath(".//text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+# Whitespace BeautifulSoup collapses between tags, and the tags where it keeps it as-is
+_ASCII_SPACES = ' \n\t\f\r'
+_PRESERVES_WHITESPACE = etree.XPath("ancestor-or-self::*[self::pre or self::textarea]")
+# Where clean text is broken into chunks: every str.splitlines() boundary, and double spaces
+_CHUNK_BREAK_RE = re.compile('\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]|  ')
+
+
+def _parse_page(text: str) -> Optional[etree._Element]:
+    """Parse a fetched page into an lxml tree, or None if it is empty"""
+    try:
+        return lxml_html.document_fromstring(text)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        return lxml_html.document_fromstring(text.encode('utf-8'))
+    except etree.ParserError:
+        return None
+
+
+def _find_div(tree: etree._Element, *div_ids: str) -> Optional[etree._Element]:
+    """First div with the first of div_ids that exists on the page"""
+    for div_id in div_ids:
+        found = _DIV_BY_ID(tree, div_id=div_id)
+        if found:
+            return found[0]
+    return None
+
+
+def _page_title_elem(tree: etree._Element) -> Optional[etree._Element]:
+    """The page's h1.firstHeading, or failing that its first h1"""
+    found = _FIRST_HEADING(tree) or _FIRST_H1(tree)
+    return found[0] if found else None
+
+
+def _title_from_url(url: str) -> str:
+    """Page title as MediaWiki spells it in the URL, for pages with no usable heading"""
+    return unquote(urlparse(url).path.rsplit('/', 1)[-1]).replace('_', ' ') or url
+
+
+def _visible_text(elem: etree._Element) -> str:
+    """Text of elem and its descendants, as BeautifulSoup's get_text() gives it"""
+    return ''.join(_VISIBLE_TEXT(elem))
+
+
+def _page_text(elem: etree._Element) -> str:
+    """Text of a whole page, as BeautifulSoup's get_text() gives it
+    
+    BeautifulSoup also reduces every whitespace-only run between tags to a newline
+    (if it had one) or a single space, except inside pre and textarea
+    """
+    parts = []
+    for text in _VISIBLE_TEXT(elem):
+        if not text.strip(_ASCII_SPACES):
+            owner = text.getparent()
+            container = owner.getparent() if text.is_tail else owner
+            if container is None or not _PRESERVES_WHITESPACE(container):
+                text = '\n' if '\n' in text else ' '
+        parts.append(text)
+    return ''.join(parts)
+
+
 class CWCkiScraper:
     def __init__(self, base_url: str = "https://sonichu.com/cwcki"):
         self.base_url = base_url
@@ -37,52 +119,76 @@ class CWCkiScraper:
             'User-Agent': 'CWCki Research Bot/1.0 (Educational Purpose)'
         })
         self.rate_limit_delay = 1  # 1 second between requests
+        self.rate_limiter = RateLimiter(self.rate_limit_delay)  # Shared by all fetch threads
+        self.image_workers = 8  # Images downloaded in parallel, across all pages
+        self.image_rate_limit_delay = 0.1  # Min spacing between image requests - static files, not wiki pages
+        self.image_rate_limiter = RateLimiter(self.image_rate_limit_delay)
         self.max_retries = 3  # Reduced retries for faster failure
         self.retry_delay = 5  # Initial retry delay in seconds
+        
+        # Keep-alive connections for every worker thread. Throttling and 5xx responses are
+        # retried inside urllib3 (honouring Retry-After); timeouts and connection errors
+        # are retried by _make_request
+        adapter = HTTPAdapter(
+            pool_connections=16,  # Distinct hosts kept alive (wiki + image hosts)
+            pool_maxsize=32,
+            max_retries=Retry(total=None, connect=0, read=0, other=0, status=self.max_retries,
+                              backoff_factor=self.retry_delay,
+                              status_forcelist=[429, 500, 502, 503, 504],
+                              allowed_methods=['GET', 'HEAD'],
+                              respect_retry_after_header=True,
+                              raise_on_status=False)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.visited_urls: Set[str] = set()
         self.discovered_pages: Dict[str, str] = {}  # url -> title mapping
         self.max_image_size = 10 * 1024 * 1024  # 10MB max per image
-        
-    def _make_request(self, url: str, retry_count: int = 0) -> Optional[requests.Response]:
-        """Make HTTP request with comprehensive retry logic and exponential backoff"""
-        time.sleep(self.rate_limit_delay)
-        
-        try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response
-            
-        except requests.exceptions.Timeout as e:
-            logger.warning(f"Timeout fetching {url} (attempt {retry_count + 1}/{self.max_retries})")
-            return self._retry_request(url, retry_count, e)
+        self.image_chunk_size = 64 * 1024  # Images are streamed to disk in pieces this size
+        # Image URL -> local path (relative to the output dir) - logos and infobox images
+        # recur across many pages and only need downloading once
+        self.image_paths: Dict[str, str] = {}
+        
+    def _make_request(self, url: str, stream: bool = False,
+                      rate_limiter: Optional[RateLimiter] = None) -> Optional[requests.Response]:
+        """Make HTTP request with comprehensive retry logic and exponential backoff
+        
+        Requests are paced by rate_limiter, the page rate limiter unless another is given
+        """
+        rate_limiter = rate_limiter or self.rate_limiter
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Exponential backoff: 5, 10, 20 seconds
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                logger.info(f"Retrying in {delay} seconds...")
+                time.sleep(delay)
+            rate_limiter.wait()
             
-        except requests.exceptions.ConnectionError as e:
-            logger.warning(f"Connection error for {url} (attempt {retry_count + 1}/{self.max_retries})")
-            return self._retry_request(url, retry_count, e)
-            
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code in [429, 500, 502, 503, 504]:  # Retryable errors
-                logger.warning(f"HTTP {e.response.status_code} for {url} (attempt {retry_count + 1}/{self.max_retries})")
-                return self._retry_request(url, retry_count, e)
-            else:
+            try:
+                response = self.session.get(url, timeout=30, stream=stream)
+                response.raise_for_status()
+                return response
+                
+            except requests.exceptions.Timeout:
+                logger.warning(f"Timeout fetching {url} (attempt {attempt + 1}/{self.max_retries + 1})")
+                
+            except requests.exceptions.ConnectionError:
+                logger.warning(f"Connection error for {url} (attempt {attempt + 1}/{self.max_retries + 1})")
+                
+            except requests.exceptions.HTTPError as e:
+                # Retryable statuses only get here once urllib3 has used up its retries
                 logger.error(f"HTTP {e.response.status_code} for {url}: Not retrying")
                 return None
-                
-        except Exception as e:
-            logger.error(f"Unexpected error fetching {url}: {e}")
-            return self._retry_request(url, retry_count, e)
+                    
+            except Exception as e:
+                logger.error(f"Unexpected error fetching {url}: {e}")
+        
+        logger.error(f"Max retries ({self.max_retries}) exceeded for {url}")
+        return None
     
-    def _retry_request(self, url: str, retry_count: int, error: Exception) -> Optional[requests.Response]:
-        """Handle retry logic with exponential backoff"""
-        if retry_count < self.max_retries:
-            # Exponential backoff: 2, 4, 8, 16, 32 seconds
-            delay = self.retry_delay * (2 ** retry_count)
-            logger.info(f"Retrying in {delay} seconds...")
-            time.sleep(delay)
-            return self._make_request(url, retry_count + 1)
-        else:
-            logger.error(f"Max retries ({self.max_retries}) exceeded for {url}")
-            return None
+    def _safe_filename(self, title: str) -> str:
+        """File name stem for a page title - shared by the resume check and the writers"""
+        return _SAFE_FN_RE.sub('_', title)[:100]
     
     def _is_valid_wiki_url(self, url: str) -> bool:
         """Check if URL is a valid CWCki page"""
@@ -100,31 +206,29 @@ class CWCkiScraper:
             'Template:' not in url
         )
     
-    def _save_discovery_checkpoint(self, checkpoint_file: Path, to_visit: List[str]):
+    def _save_discovery_checkpoint(self, checkpoint_file: Path, to_visit: Iterable[str]):
         """Save current discovery progress to checkpoint file"""
         checkpoint_data = {
             'discovered_pages': self.discovered_pages,
             'visited_urls': list(self.visited_urls),
-            'to_visit_queue': to_visit[:500],  # Save first 500 URLs to visit
+            'to_visit_queue': list(islice(to_visit, 500)),  # Save first 500 URLs to visit
             'last_updated': datetime.now().isoformat(),
             'total_discovered': len(self.discovered_pages)
         }
-        with open(checkpoint_file, 'w', encoding='utf-8') as f:
-            json.dump(checkpoint_data, f, indent=2, ensure_ascii=False)
+        json_io.dump(checkpoint_data, checkpoint_file)
         logger.info(f"📝 Checkpoint saved: {len(self.discovered_pages)} pages discovered")
     
-    def _load_discovery_checkpoint(self, checkpoint_file: Path) -> Optional[List[str]]:
+    def _load_discovery_checkpoint(self, checkpoint_file: Path) -> Optional[Deque[str]]:
         """Load discovery progress from checkpoint file, returns to_visit queue"""
         if not checkpoint_file.exists():
             return None
         
         try:
-            with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                checkpoint_data = json.load(f)
+            checkpoint_data = json_io.load(checkpoint_file)
             
             self.discovered_pages = checkpoint_data['discovered_pages']
             self.visited_urls = set(checkpoint_data['visited_urls'])
-            to_visit = checkpoint_data.get('to_visit_queue', [])
+            to_visit = deque(checkpoint_data.get('to_visit_queue', []))
             
             logger.info(f"✅ Resumed from checkpoint:")
             logger.info(f"   Pages discovered: {len(self.discovered_pages)}")
@@ -137,8 +241,37 @@ class CWCkiScraper:
             return None
 
     
-    def discover_all_pages(self, start_url: str = None, max_pages: int = 3000, checkpoint_interval: int = 50) -> List[str]:
-        """Crawl the wiki to discover all pages with checkpoint/resume support"""
+    def _discover_page(self, url: str) -> Optional[Tuple[Optional[str], List[str]]]:
+        """Fetch a page for discovery - returns its title (if any) and the wiki links on it"""
+        response = self._make_request(url)
+        if not response:
+            return None
+        
+        tree = _parse_page(response.text)
+        if tree is None:
+            return None, []
+        
+        # Extract page title
+        title_elem = _page_title_elem(tree)
+        title = _visible_text(title_elem).strip() if title_elem is not None else None
+        
+        # Find all wiki links
+        links = []
+        content_div = _find_div(tree, 'mw-content-text', 'content')
+        if content_div is not None:
+            for link in _LINKS(content_div):
+                full_url = urljoin(url, link.get('href'))
+                if self._is_valid_wiki_url(full_url):
+                    links.append(full_url)
+        
+        return title, links
+    
+    def discover_all_pages(self, start_url: str = None, max_pages: int = 3000, checkpoint_interval: int = 50,
+                           concurrency: int = 8) -> List[str]:
+        """Crawl the wiki to discover all pages with checkpoint/resume support
+        
+        Up to `concurrency` pages are fetched at once, all paced by the shared rate limiter
+        """
         if start_url is None:
             start_url = self.base_url
         
@@ -148,54 +281,62 @@ class CWCkiScraper:
         
         if to_visit is None:
             logger.info(f"Starting fresh discovery from: {start_url}")
-            to_visit = [start_url]
+            to_visit = deque([start_url])  # O(1) popleft - the frontier grows into the thousands
         else:
             logger.info(f"▶️  Resuming discovery from checkpoint")
             # If queue is empty but we have discovered pages, add one to continue
             if not to_visit and self.discovered_pages:
-                to_visit = [list(self.discovered_pages.keys())[0]]
+                to_visit = deque([next(iter(self.discovered_pages))])
         
         pages_since_checkpoint = 0
-        
-        with tqdm(desc="Discovering pages", total=max_pages, initial=len(self.discovered_pages)) as pbar:
-            while to_visit and len(self.discovered_pages) < max_pages:
-                url = to_visit.pop(0)
-                
-                if url in self.visited_urls:
-                    continue
+        in_flight = {}  # future -> url, fetched by worker threads
+        
+        # Workers only fetch and parse - the queue, visited set and discovered pages are
+        # updated on this thread alone, as each fetch completes
+        with ThreadPoolExecutor(max_workers=concurrency) as discover_pool, \
+             tqdm(desc="Discovering pages", total=max_pages, initial=len(self.discovered_pages)) as pbar:
+            while True:
+                # Keep the pool busy without fetching far past max_pages
+                in_flight_urls = set(in_flight.values())
+                while (to_visit and len(in_flight) < concurrency
+                       and len(self.discovered_pages) + len(in_flight) < max_pages):
+                    url = to_visit.popleft()
+                    if url not in self.visited_urls and url not in in_flight_urls:
+                        in_flight[discover_pool.submit(self._discover_page, url)] = url
+                        in_flight_urls.add(url)
                 
-                self.visited_urls.add(url)
-                response = self._make_request(url)
+                if not in_flight:
+                    break
                 
-                if not response:
-                    continue
-                
-                soup = BeautifulSoup(response.text, 'lxml')
-                
-                # Extract page title
-                title_elem = soup.find('h1', class_='firstHeading') or soup.find('h1')
-                if title_elem:
-                    title = title_elem.get_text().strip()
-                    if url not in self.discovered_pages:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = in_flight.pop(future)
+                    self.visited_urls.add(url)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Exception discovering '{url}': {e}")
+                        continue
+                    if not result:
+                        continue
+                    
+                    title, links = result
+                    if url not in self.discovered_pages and len(self.discovered_pages) < max_pages:
+                        if not title:
+                            title = _title_from_url(url)
+                            logger.warning(f"No title found on {url} - using '{title}'")
                         self.discovered_pages[url] = title
                         pbar.update(1)
                         pbar.set_postfix({'pages': len(self.discovered_pages)})
                         pages_since_checkpoint += 1
-                
-                # Find all wiki links
-                content_div = soup.find('div', id='mw-content-text') or soup.find('div', id='content')
-                if content_div:
-                    links = content_div.find_all('a', href=True)
-                    for link in links:
-                        href = link['href']
-                        full_url = urljoin(url, href)
-                        
-                        if self._is_valid_wiki_url(full_url) and full_url not in self.visited_urls:
+                    
+                    for full_url in links:
+                        if full_url not in self.visited_urls:
                             to_visit.append(full_url)
                 
-                # Save checkpoint periodically
+                # Save checkpoint periodically - pages still in flight go back at the front of the queue
                 if pages_since_checkpoint >= checkpoint_interval:
-                    self._save_discovery_checkpoint(checkpoint_file, to_visit)
+                    self._save_discovery_checkpoint(checkpoint_file, [*in_flight.values(), *to_visit])
                     pages_since_checkpoint = 0
         
         # Final checkpoint save
@@ -204,17 +345,17 @@ class CWCkiScraper:
         logger.info(f"\n✅ Discovery complete: {len(self.discovered_pages)} pages total")
         return list(self.discovered_pages.keys())
     
-    def extract_media_from_page(self, soup: BeautifulSoup, page_url: str) -> Tuple[List[Dict], List[Dict]]:
-        """Extract images and video URLs from page"""
+    def extract_media_from_page(self, content_div: Optional[etree._Element],
+                                page_url: str) -> Tuple[List[Dict], List[Dict]]:
+        """Extract images and video URLs from the page's content div (found by get_page_content)"""
         images = []
         videos = []
         
-        content_div = soup.find('div', id='mw-content-text') or soup.find('div', id='bodyContent')
-        if not content_div:
+        if content_div is None:
             return images, videos
         
         # Extract images
-        for img in content_div.find_all('img'):
+        for img in content_div.iter('img'):
             src = img.get('src', '')
             if src:
                 # Make absolute URL
@@ -225,11 +366,11 @@ class CWCkiScraper:
                 
                 # Check if it's in a figure with caption
                 caption = ''
-                parent = img.find_parent('figure') or img.find_parent('div', class_='thumbinner')
+                parent = _FIGURE_ANCESTOR(img) or _THUMBINNER_ANCESTOR(img)
                 if parent:
-                    caption_elem = parent.find('figcaption') or parent.find('div', class_='thumbcaption')
+                    caption_elem = _FIGCAPTION(parent[0]) or _THUMBCAPTION(parent[0])
                     if caption_elem:
-                        caption = caption_elem.get_text().strip()
+                        caption = _visible_text(caption_elem[0]).strip()
                 
                 images.append({
                     'url': img_url,
@@ -240,7 +381,7 @@ class CWCkiScraper:
         
         # Extract videos (YouTube embeds, etc.)
         # Look for iframe embeds
-        for iframe in content_div.find_all('iframe'):
+        for iframe in content_div.iter('iframe'):
             src = iframe.get('src', '')
             if 'youtube' in src or 'youtu.be' in src:
                 videos.append({
@@ -250,7 +391,7 @@ class CWCkiScraper:
                 })
         
         # Look for video tags
-        for video in content_div.find_all('video'):
+        for video in content_div.iter('video'):
             src = video.get('src', '')
             if src:
                 videos.append({
@@ -262,25 +403,45 @@ class CWCkiScraper:
         return images, videos
     
     def download_image(self, img_url: str, output_path: Path) -> bool:
-        """Download a single image with size check"""
+        """Download a single image with size check, streaming it straight to disk"""
         try:
-            response = self._make_request(img_url)
+            # Streamed so an oversized image is rejected without buffering it all in memory
+            response = self._make_request(img_url, stream=True, rate_limiter=self.image_rate_limiter)
             if not response:
                 return False
             
-            # Check size
-            content_length = int(response.headers.get('content-length', 0))
-            if content_length > self.max_image_size:
-                logger.info(f"Skipping large image ({content_length/1024/1024:.1f}MB): {img_url}")
-                return False
+            with response:
+                # Check size up front when the server reports it
+                content_length = int(response.headers.get('content-length') or 0)
+                if content_length > self.max_image_size:
+                    logger.info(f"Skipping large image ({content_length/1024/1024:.1f}MB): {img_url}")
+                    return False
+                
+                # Save image into images_dir (created by scrape_all_pages). One that fits in a
+                # single chunk is read and written in one go; anything else is streamed, aborting
+                # once the cap is passed (content-length can be missing or wrong)
+                if 0 < content_length <= self.image_chunk_size:
+                    data = response.content
+                    size = len(data)
+                    if size <= self.max_image_size:
+                        output_path.write_bytes(data)
+                else:
+                    size = 0
+                    with open(output_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=self.image_chunk_size):
+                            size += len(chunk)
+                            if size > self.max_image_size:
+                                break
+                            f.write(chunk)
             
-            # Save image
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+            if size > self.max_image_size:
+                output_path.unlink(missing_ok=True)
+                logger.info(f"Skipping large image (>{self.max_image_size/1024/1024:.1f}MB streamed): {img_url}")
+                return False
             return True
             
         except Exception as e:
+            output_path.unlink(missing_ok=True)
             logger.warning(f"Failed to download image {img_url}: {e}")
             return False
     
@@ -290,36 +451,40 @@ class CWCkiScraper:
         if not response:
             return None
         
-        soup = BeautifulSoup(response.text, 'lxml')
+        # lxml directly - BeautifulSoup was parsing with lxml anyway, then walking its own slower tree
+        tree = _parse_page(response.text)
+        if tree is None:
+            tree = lxml_html.document_fromstring('<html></html>')  # Empty page - every lookup below misses
         
         # Extract title
-        title_elem = soup.find('h1', class_='firstHeading') or soup.find('h1')
-        title = title_elem.get_text().strip() if title_elem else self.discovered_pages.get(url, url)
+        title_elem = _page_title_elem(tree)
+        title = _visible_text(title_elem).strip() if title_elem is not None else self.discovered_pages.get(url, url)
         
         # Extract main content
-        content_div = soup.find('div', id='mw-content-text') or soup.find('div', id='bodyContent')
-        html_content = str(content_div) if content_div else ""
+        content_div = _find_div(tree, 'mw-content-text', 'bodyContent')
+        html_content = (lxml_html.tostring(content_div, encoding='unicode', with_tail=False)
+                        if content_div is not None else "")
         
         # Extract categories
         categories = []
-        cat_div = soup.find('div', id='mw-normal-catlinks')
-        if cat_div:
-            cat_links = cat_div.find_all('a')
-            categories = [link.get_text() for link in cat_links if link.get_text() != 'Categories']
-        
-        # Extract internal links
-        links = []
-        if content_div:
-            for link in content_div.find_all('a', href=True):
-                href = link['href']
+        cat_div = _find_div(tree, 'mw-normal-catlinks')
+        if cat_div is not None:
+            cat_texts = (_visible_text(link) for link in cat_div.iter('a'))
+            categories = [text for text in cat_texts if text != 'Categories']
+        
+        # Extract internal links - a set, so repeats are dropped as they are found
+        links = set()
+        if content_div is not None:
+            for link in _LINKS(content_div):
+                href = link.get('href')
                 full_url = urljoin(url, href)
                 if self._is_valid_wiki_url(full_url):
-                    link_text = link.get_text().strip()
+                    link_text = _visible_text(link).strip()
                     if link_text:
-                        links.append(link_text)
+                        links.add(link_text)
         
         # Extract media
-        images, videos = self.extract_media_from_page(soup, url)
+        images, videos = self.extract_media_from_page(content_div, url)
         
         return {
             'url': url,
@@ -327,7 +492,7 @@ class CWCkiScraper:
             'display_title': title,
             'html_content': html_content,
             'categories': categories,
-            'links': list(set(links)),  # Remove duplicates
+            'links': list(links),
             'images': images,
             'videos': videos,
             'scraped_at': datetime.now().isoformat()
@@ -335,24 +500,125 @@ class CWCkiScraper:
     
     def clean_html_content(self, html: str) -> str:
         """Extract clean text from HTML"""
-        soup = BeautifulSoup(html, 'lxml')
+        tree = _parse_page(html)
+        if tree is None:
+            return ''
         
-        # Remove script and style elements
-        for script in soup(['script', 'style']):
-            script.decompose()
+        # Get text, leaving out script and style contents
+        text = _page_text(tree)
         
-        # Get text
-        text = soup.get_text()
+        # Clean up whitespace - one chunk per line or double-space-separated phrase
+        chunks = (chunk.strip() for chunk in _CHUNK_BREAK_RE.split(text))
+        return '\n'.join(chunk for chunk in chunks if chunk)
+    
+    def _scrape_one(self, url: str, output_path: Path, images_dir: Path,
+                    image_pool: ThreadPoolExecutor) -> Tuple[Optional[Dict], int, int]:
+        """Fetch one page, save its raw JSON and clean text and download its images
+        
+        Returns the page's media index entry (None if the page had no content) plus
+        its downloaded and skipped image counts. Runs on a scrape_all_pages worker thread.
+        """
+        content = self.get_page_content(url)
+        if not content:
+            return None, 0, 0
+        
+        title = content['title']
+        safe_filename = self._safe_filename(title)
+        
+        # Save raw JSON
+        json_path = output_path / "raw_json" / f"{safe_filename}.json"
+        json_io.dump(content, json_path)
+        
+        # Save clean text
+        clean_text = self.clean_html_content(content['html_content'])
+        text_path = output_path / "clean_text" / f"{safe_filename}.txt"
+        
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(f"Title: {title}\n")
+            f.write(f"URL: {url}\n")
+            f.write(f"Categories: {', '.join(content['categories'])}\n")
+            f.write(f"{'='*80}\n\n")
+            f.write(clean_text)
+        
+        # Download images for this page - in parallel on the image pool, paced by the image rate limiter
+        downloads = []  # (img_data, local path of an already-downloaded copy or None, future, filename)
+        for idx, img_data in enumerate(content.get('images', [])):
+            img_url = img_data['url']
+            
+            # Reuse an image another page already downloaded. Two pages racing on the same
+            # new URL just download it twice, which is harmless
+            local_path = self.image_paths.get(img_url)
+            if local_path and (output_path / local_path).exists():
+                downloads.append((img_data, local_path, None, Path(local_path).name))
+                continue
+            
+            # Create unique filename using hash
+            img_hash = hashlib.md5(img_url.encode(), usedforsecurity=False).hexdigest()[:12]
+            img_ext = Path(urlparse(img_url).path).suffix or '.jpg'
+            img_filename = f"{safe_filename}_{idx}_{img_hash}{img_ext}"
+            future = image_pool.submit(self.download_image, img_url, images_dir / img_filename)
+            downloads.append((img_data, None, future, img_filename))
+        
+        # Collect results in page order, so the index lists images as the page does
+        page_images = []
+        downloaded = 0
+        skipped = 0
+        for img_data, local_path, future, img_filename in downloads:
+            if future is not None:
+                if not future.result():
+                    skipped += 1
+                    continue
+                local_path = str((images_dir / img_filename).relative_to(output_path))
+                self.image_paths[img_data['url']] = local_path
+            page_images.append({
+                **img_data,
+                'local_path': local_path,
+                'filename': img_filename
+            })
+            downloaded += 1
+        
+        # Build media index entry
+        page_entry = {
+            'page_title': title,
+            'page_url': url,
+            'safe_filename': safe_filename,
+            'images': page_images,
+            'videos': content.get('videos', [])
+        }
+        return page_entry, downloaded, skipped
+    
+    def _load_media_log(self, media_log_path: Path) -> Dict[str, Dict]:
+        """Read the scrape's media log into page URL -> {'downloaded', 'skipped', 'page'} records"""
+        records = {}
+        if not media_log_path.exists():
+            return records
+        
+        valid_bytes = 0
+        with open(media_log_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                valid_bytes += len(line)
+                try:
+                    record = json_io.loads(line)
+                except json_io.JSONDecodeError:
+                    continue
+                # A page scraped again after its text was deleted replaces its earlier entry
+                records[record['page']['page_url']] = record
         
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
+        if valid_bytes < media_log_path.stat().st_size:
+            # Drop a torn final line so new lines aren't appended onto it
+            with open(media_log_path, 'r+b') as f:
+                f.truncate(valid_bytes)
         
-        return text
+        return records
     
-    def scrape_all_pages(self, output_dir: str = "scraped_data", max_pages: int = 3000):
-        """Scrape all pages and save to disk with resume capability"""
+    def scrape_all_pages(self, output_dir: str = "scraped_data", max_pages: int = 3000, concurrency: int = 8):
+        """Scrape all pages and save to disk with resume capability
+        
+        Up to `concurrency` pages are scraped at once - the rate limit still caps request
+        starts, but one slow page (or one with many images) no longer holds up the rest
+        """
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
@@ -364,7 +630,7 @@ class CWCkiScraper:
         print("\n" + "="*80)
         print("PHASE 1: Discovering all pages")
         print("="*80)
-        page_urls = self.discover_all_pages(max_pages=max_pages)
+        page_urls = self.discover_all_pages(max_pages=max_pages, concurrency=concurrency)
         
         # Save page list
         page_data = {
@@ -374,23 +640,18 @@ class CWCkiScraper:
                 for url in page_urls
             ]
         }
-        with open(output_path / "page_titles.json", 'w', encoding='utf-8') as f:
-            json.dump(page_data, f, indent=2, ensure_ascii=False)
+        json_io.dump(page_data, output_path / "page_titles.json")
         
-        # Check for already scraped pages
-        existing_files = set(p.stem for p in (output_path / "clean_text").glob("*.txt"))
+        # Check for already scraped pages - scandir gives names without a stat per file
+        with os.scandir(output_path / "clean_text") as entries:
+            existing_files = {entry.name[:-4] for entry in entries if entry.name.endswith('.txt')}
         logger.info(f"Found {len(existing_files)} already scraped pages")
         
         # Filter to only unscraped URLs
-        urls_to_scrape = []
-        skipped = 0
-        for url in page_urls:
-            title = self.discovered_pages.get(url, url)
-            safe_filename = re.sub(r'[^\w\s-]', '_', title)[:100]
-            if safe_filename not in existing_files:
-                urls_to_scrape.append(url)
-            else:
-                skipped += 1
+        safe_filename = self._safe_filename
+        urls_to_scrape = [url for url in page_urls
+                          if safe_filename(self.discovered_pages.get(url, url)) not in existing_files]
+        skipped = len(page_urls) - len(urls_to_scrape)
         
         logger.info(f"Skipping {skipped} already scraped pages")
         logger.info(f"Will scrape {len(urls_to_scrape)} new pages")
@@ -406,87 +667,58 @@ class CWCkiScraper:
         images_dir = media_dir / "images"
         images_dir.mkdir(parents=True, exist_ok=True)
         
+        # Pages are logged as they finish, so an interrupted run keeps its media info
+        media_log_path = media_dir / "scrape_media_index.jsonl"
+        media_records = self._load_media_log(media_log_path)
+        if media_records:
+            logger.info(f"Loaded {len(media_records)} pages from {media_log_path.name}")
+        for record in media_records.values():
+            for img in record['page']['images']:
+                self.image_paths.setdefault(img['url'], img['local_path'])
+        
         successful = 0
         failed = []
-        media_index = []
-        downloaded_images = 0
-        skipped_images = 0
         
-        for url in tqdm(urls_to_scrape, desc="Scraping pages"):
-            try:
-                content = self.get_page_content(url)
-                
-                if content:
-                    title = content['title']
-                    safe_filename = re.sub(r'[^\w\s-]', '_', title)[:100]
-                    
-                    # Save raw JSON
-                    json_path = output_path / "raw_json" / f"{safe_filename}.json"
-                    with open(json_path, 'w', encoding='utf-8') as f:
-                        json.dump(content, f, indent=2, ensure_ascii=False)
-                    
-                    # Save clean text
-                    clean_text = self.clean_html_content(content['html_content'])
-                    text_path = output_path / "clean_text" / f"{safe_filename}.txt"
-                    
-                    with open(text_path, 'w', encoding='utf-8') as f:
-                        f.write(f"Title: {title}\n")
-                        f.write(f"URL: {url}\n")
-                        f.write(f"Categories: {', '.join(content['categories'])}\n")
-                        f.write(f"{'='*80}\n\n")
-                        f.write(clean_text)
-                    
-                    # Download images for this page
-                    page_images = []
-                    for idx, img_data in enumerate(content.get('images', [])):
-                        img_url = img_data['url']
-                        # Create unique filename using hash
-                        img_hash = hashlib.md5(img_url.encode()).hexdigest()[:12]
-                        img_ext = Path(urlparse(img_url).path).suffix or '.jpg'
-                        img_filename = f"{safe_filename}_{idx}_{img_hash}{img_ext}"
-                        img_path = images_dir / img_filename
-                        
-                        if self.download_image(img_url, img_path):
-                            page_images.append({
-                                **img_data,
-                                'local_path': str(img_path.relative_to(output_path)),
-                                'filename': img_filename
-                            })
-                            downloaded_images += 1
-                        else:
-                            skipped_images += 1
-                    
-                    # Build media index entry
-                    media_index.append({
-                        'page_title': title,
-                        'page_url': url,
-                        'safe_filename': safe_filename,
-                        'images': page_images,
-                        'videos': content.get('videos', [])
-                    })
+        with ThreadPoolExecutor(max_workers=concurrency) as scrape_pool, \
+             ThreadPoolExecutor(max_workers=self.image_workers) as image_pool, \
+             open(media_log_path, 'a', encoding='utf-8', buffering=1) as media_log:
+            scrapes = {scrape_pool.submit(self._scrape_one, url, output_path, images_dir, image_pool): url
+                       for url in urls_to_scrape}
+            # Workers do the fetch, writes and image downloads - totals are kept on this thread only
+            for future in tqdm(as_completed(scrapes), total=len(scrapes), desc="Scraping pages"):
+                url = scrapes[future]
+                try:
+                    page_entry, page_downloaded, page_skipped = future.result()
                     
-                    successful += 1
-                else:
-                    failed.append({'url': url, 'error': 'No content returned'})
+                    if page_entry:
+                        record = {'downloaded': page_downloaded, 'skipped': page_skipped, 'page': page_entry}
+                        media_log.write(json_io.dumps(record) + '\n')
+                        media_records[url] = record
+                        successful += 1
+                    else:
+                        failed.append({'url': url, 'error': 'No content returned'})
                     
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"Exception scraping '{url}': {error_msg}")
-                failed.append({'url': url, 'error': error_msg})
+                except Exception as e:
+                    error_msg = str(e)
+                    logger.error(f"Exception scraping '{url}': {error_msg}")
+                    failed.append({'url': url, 'error': error_msg})
+        
+        media_index = [record['page'] for record in media_records.values()]
+        downloaded_images = sum(record['downloaded'] for record in media_records.values())
+        skipped_images = sum(record['skipped'] for record in media_records.values())
         
-        # Save media index - CRITICAL: Only write if we actually scraped pages
+        # Save media index - CRITICAL: Only write if we have scraped pages (this run or logged earlier)
         media_index_path = media_dir / "media_index.json"
         should_write_media_index = False
         
         if len(media_index) > 0:
-            # We scraped new pages, check if we should write
+            # We have pages to index, check if we should write
             should_write_media_index = True
             
             # Safety check: don't overwrite if existing file has more complete data
             if media_index_path.exists():
                 try:
-                    with open(media_index_path, 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
+                    existing_data = json_io.load(media_index_path)
                     existing_pages = len(existing_data.get('pages', []))
                     existing_images = existing_data.get('total_images', 0)
                     
@@ -509,14 +741,13 @@ class CWCkiScraper:
                 should_write_media_index = True
         
         if should_write_media_index:
-            with open(media_index_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'total_pages': len(media_index),
-                    'total_images': downloaded_images,
-                    'skipped_images': skipped_images,
-                    'total_videos': sum(len(p['videos']) for p in media_index),
-                    'pages': media_index
-                }, f, indent=2, ensure_ascii=False)
+            json_io.dump({
+                'total_pages': len(media_index),
+                'total_images': downloaded_images,
+                'skipped_images': skipped_images,
+                'total_videos': sum(len(p['videos']) for p in media_index),
+                'pages': media_index
+            }, media_index_path)
             logger.info(f"\n✅ Saved media_index.json with {len(media_index)} pages")
         
         logger.info(f"\n📸 Media downloaded:")
@@ -534,13 +765,11 @@ class CWCkiScraper:
             'success_rate': f"{(successful/len(page_urls)*100):.2f}%" if page_urls else "0%"
         }
         
-        with open(output_path / "scrape_summary.json", 'w') as f:
-            json.dump(summary, f, indent=2, ensure_ascii=False)
+        json_io.dump(summary, output_path / "scrape_summary.json")
         
         # Also save failed pages separately for easy review
         if failed:
-            with open(output_path / "failed_pages.json", 'w') as f:
-                json.dump(failed, f, indent=2, ensure_ascii=False)
+            json_io.dump(failed, output_path / "failed_pages.json")
         
         logger.info(f"\n{'='*80}")
         logger.info(f"Scraping complete!")